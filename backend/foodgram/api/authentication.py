@@ -0,0 +1,19 @@
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from users.token_cache import token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием пользователя"""
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return user, token
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                'Пользователь неактивен или удален.')
+        return user, self.get_model()(key=key, user=user)
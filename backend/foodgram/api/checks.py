@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+
+def is_process_local(cache):
+    return isinstance(cache, LocMemCache)
+
+
+@register()
+def check_replica_stickiness(app_configs, **kwargs):
+    """Отметка о записи пользователя должна быть видна всем процессам"""
+    if not (settings.DATABASE_REPLICAS and settings.REPLICA_STICKY_SECONDS
+            and is_process_local(caches['default'])):
+        return []
+    return [Error(
+        'Чтение с реплик после записи опирается на общий кэш, а кэш '
+        'по умолчанию хранится в памяти процесса: остальные процессы '
+        'не увидят записи пользователя и прочитают устаревшие данные.',
+        hint='Укажите общий кэш в CACHE_BACKEND и CACHE_LOCATION или '
+             'отключите привязку: REPLICA_STICKY_SECONDS=0.',
+        id='api.E001',
+    )]
+
+
+@register()
+def check_token_cache(app_configs, **kwargs):
+    """Отозванный токен должен сразу перестать действовать везде"""
+    if not (settings.AUTH_TOKEN_CACHE_SHARED
+            and is_process_local(caches['default'])):
+        return []
+    return [Error(
+        'AUTH_TOKEN_CACHE_SHARED включен, но кэш по умолчанию хранится '
+        'в памяти процесса: отозванный токен останется действительным '
+        'в других процессах.',
+        hint='Укажите общий кэш в CACHE_BACKEND и CACHE_LOCATION или '
+             'выключите AUTH_TOKEN_CACHE_SHARED.',
+        id='api.E002',
+    )]
+
+
+@register()
+def check_membership_cache(app_configs, **kwargs):
+    """Сброс кэша избранного и корзины должен доходить до всех процессов"""
+    if not (settings.MEMBERSHIP_CACHE_ENABLED
+            and is_process_local(caches['default'])):
+        return []
+    return [Error(
+        'MEMBERSHIP_CACHE_ENABLED включен, но кэш по умолчанию хранится '
+        'в памяти процесса: после изменения избранного или корзины '
+        'другие процессы будут отдавать устаревшие is_favorited и '
+        'is_in_shopping_cart.',
+        hint='Укажите общий кэш в CACHE_BACKEND и CACHE_LOCATION или '
+             'выключите MEMBERSHIP_CACHE_ENABLED.',
+        id='api.E003',
+    )]
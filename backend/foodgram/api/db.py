@@ -0,0 +1,76 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_observers = contextvars.ContextVar('query_observers', default=())
+
+
+@contextmanager
+def observe_queries(wrapper):
+    """Подключает execute-обертку ко всем запросам текущего контекста.
+
+    В отличие от connection.execute_wrapper обертка действует и в потоках
+    пула БД, куда контекст копируется вместе с вызовом.
+    """
+    token = _observers.set(_observers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _observers.reset(token)
+
+
+def dispatch(execute, sql, params, many, context):
+    for wrapper in reversed(_observers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_dispatcher(sender, connection, **kwargs):
+    if dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch)
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(max_workers=settings.ASGI_DB_THREADS,
+                              thread_name_prefix='db')
+
+
+def _call(func, args, kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+_DONE = object()
+
+
+async def iterate_in_db_pool(iterable):
+    """Асинхронно перебирает синхронный итератор, получая каждый элемент
+    в пуле потоков БД.
+
+    Элементы могут вычисляться в разных потоках пула, поэтому итератор
+    не должен держать курсор между ними.
+    """
+    iterator = iter(iterable)
+    while True:
+        item = await run_in_db_pool(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+async def run_in_db_pool(func, *args, **kwargs):
+    """Выполняет синхронный код с доступом к базе в ограниченном пуле
+    потоков, поэтому соединений с базой не больше ASGI_DB_THREADS"""
+    loop = asyncio.get_event_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor(), partial(context.run, _call, func, args, kwargs))
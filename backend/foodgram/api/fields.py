@@ -0,0 +1,23 @@
+from django.conf import settings
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+
+class RecipeImageField(Base64ImageField):
+    """Изображение в base64 с проверкой размера до декодирования"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            encoded = data.rsplit(';base64,', 1)[-1]
+            if len(encoded) * 3 // 4 > settings.RECIPE_UPLOAD_MAX_SIZE:
+                raise serializers.ValidationError(
+                    'Размер изображения превышает допустимый')
+        image = super().to_internal_value(data)
+        if image is not None:
+            width, height = Image.open(image).size
+            image.seek(0)
+            if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+                raise serializers.ValidationError(
+                    'Разрешение изображения превышает допустимое')
+        return image
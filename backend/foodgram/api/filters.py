@@ -1,5 +1,6 @@
 from django_filters.rest_framework import FilterSet, filters
 
+from recipes.membership import FAVORITES, SHOPPING_CART, get_recipe_ids
 from recipes.models import Ingredient, Recipe, Tag
 
 
@@ -26,6 +27,7 @@ class RecipeFilter(FilterSet):
     )
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -34,11 +36,18 @@ class RecipeFilter(FilterSet):
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(favorites__user=user)
+            return queryset.filter(id__in=get_recipe_ids(user, FAVORITES))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(shopping__user=user)
+            return queryset.filter(
+                id__in=get_recipe_ids(user, SHOPPING_CART))
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if value:
+            return queryset.search(value)
         return queryset
@@ -0,0 +1,168 @@
+import json
+import math
+import os
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import User
+
+METRICS = ('p50_ms', 'p90_ms', 'p99_ms', 'queries', 'memory_kib')
+# Хвосты распределения на десятках запросов слишком шумные, чтобы по ним
+# падать, поэтому они только выводятся
+COMPARED_METRICS = ('p50_ms', 'queries', 'memory_kib')
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def consume(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число запросов к БД и память основных '
+            'эндпоинтов и сравнивает с сохраненным базовым уровнем')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--user', help='username, от чьего имени '
+                            'выполнять запросы')
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'bench_baseline.json'))
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='допустимый рост метрик, доля')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help='рост задержки меньше этого не считается '
+                                 'регрессией')
+        parser.add_argument('--save', action='store_true',
+                            help='сохранить результаты как базовый уровень')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        client = APIClient()
+        client.force_authenticate(user)
+        results = {}
+        for name, requests in self.get_endpoints(user).items():
+            results[name] = self.measure(client, requests, options)
+            self.stdout.write(f'{name}: ' + ', '.join(
+                f'{metric}={results[name][metric]}' for metric in METRICS))
+
+        if options['save']:
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовый уровень сохранен в {options["baseline"]}'))
+            return
+        if not os.path.exists(options['baseline']):
+            self.stdout.write(
+                'Базовый уровень не найден, запустите команду с --save')
+            return
+        with open(options['baseline'], encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = self.compare(results, baseline, options)
+        if regressions:
+            raise CommandError(
+                'Регрессия производительности:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено'))
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.order_by('-subscriptions_count').first()
+        if user is None:
+            raise CommandError(
+                'Пользователь не найден, заполните базу командой seed_scale')
+        return user
+
+    def get_endpoints(self, user):
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        if recipe is None:
+            raise CommandError(
+                'Рецептов нет, заполните базу командой seed_scale')
+        target = Recipe.objects.exclude(
+            id__in=Favorite.objects.filter(user=user).values('recipe')
+        ).exclude(
+            id__in=ShoppingCart.objects.filter(user=user).values('recipe')
+        ).order_by('-pub_date').first() or recipe
+        ingredient = Ingredient.objects.order_by('name').first()
+        prefix = ingredient.name[:2] if ingredient else ''
+        favorite_url = f'/api/recipes/{target.id}/favorite/'
+        cart_url = f'/api/recipes/{target.id}/shopping_cart/'
+        return {
+            'recipes.list': [('get', '/api/recipes/')],
+            'recipes.retrieve': [('get', f'/api/recipes/{recipe.id}/')],
+            'recipes.download_shopping_cart': [
+                ('get', '/api/recipes/download_shopping_cart/')],
+            'users.subscriptions': [
+                ('get', '/api/users/subscriptions/?recipes_limit=3')],
+            'ingredients.search': [
+                ('get', f'/api/ingredients/?name={prefix}')],
+            'recipes.favorite_toggle': [
+                ('post', favorite_url), ('delete', favorite_url)],
+            'recipes.shopping_cart_toggle': [
+                ('post', cart_url), ('delete', cart_url)],
+        }
+
+    def call(self, client, requests):
+        for method, url in requests:
+            response = getattr(client, method)(url)
+            consume(response)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{method.upper()} {url}: {response.status_code}')
+
+    def measure(self, client, requests, options):
+        for _ in range(options['warmup']):
+            self.call(client, requests)
+        timings = []
+        queries = []
+        for _ in range(options['requests']):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                self.call(client, requests)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(context.captured_queries))
+        tracemalloc.start()
+        self.call(client, requests)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            'p50_ms': round(percentile(timings, 50) * 1000, 2),
+            'p90_ms': round(percentile(timings, 90) * 1000, 2),
+            'p99_ms': round(percentile(timings, 99) * 1000, 2),
+            'queries': max(queries),
+            'memory_kib': round(peak / 1024, 1),
+        }
+
+    def compare(self, results, baseline, options):
+        regressions = []
+        for name, metrics in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            for metric in COMPARED_METRICS:
+                limit = expected[metric] * (1 + options['threshold'])
+                if metric == 'queries':
+                    limit = expected[metric]
+                elif metric.endswith('_ms'):
+                    limit = max(limit,
+                                expected[metric] + options['min_delta_ms'])
+                if metrics[metric] > limit:
+                    regressions.append(
+                        f'{name}.{metric}: {metrics[metric]} '
+                        f'(базовый уровень {expected[metric]})')
+        return regressions
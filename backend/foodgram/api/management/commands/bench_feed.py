@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from recipes import feed
+from recipes.models import Recipe
+from users.models import Subscription, User
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает ленту подписок на лету и материализованную'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--recipes-per-author', type=int, default=2)
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            reader = self.create_follows(options)
+            client = APIClient()
+            client.force_authenticate(reader)
+            for label, threshold in (('на лету', options['follows'] + 1),
+                                     ('материализованная', 1)):
+                with override_settings(FEED_MATERIALIZE_THRESHOLD=threshold):
+                    if threshold == 1:
+                        started = time.perf_counter()
+                        feed.materialize(reader.pk)
+                        self.stdout.write(
+                            f'Материализация: '
+                            f'{time.perf_counter() - started:.2f} с')
+                    self.measure(client, label, options)
+            transaction.set_rollback(True)
+
+    def create_follows(self, options):
+        reader = User.objects.create(
+            username='bench_feed', email='bench_feed@foodgram.ru')
+        User.objects.bulk_create(
+            User(username=f'bench_feed_{number}',
+                 email=f'bench_feed_{number}@foodgram.ru')
+            for number in range(options['follows'])
+        )
+        authors = list(User.objects.filter(
+            username__startswith='bench_feed_').values_list('id', flat=True))
+        Recipe.objects.bulk_create(
+            (Recipe(author_id=author_id, name=f'Рецепт {number}', text='-',
+                    cooking_time=1, image='recipes/bench.png')
+             for author_id in authors
+             for number in range(options['recipes_per_author'])),
+            batch_size=1000
+        )
+        Subscription.objects.bulk_create(
+            (Subscription(user=reader, author_id=author_id)
+             for author_id in authors),
+            batch_size=1000
+        )
+        User.objects.filter(pk=reader.pk).update(
+            subscriptions_count=len(authors))
+        return reader
+
+    def measure(self, client, label, options):
+        timings = [[] for _ in range(options['pages'])]
+        for _ in range(options['requests']):
+            url = '/api/recipes/feed/'
+            for page_timings in timings:
+                started = time.perf_counter()
+                response = client.get(url)
+                page_timings.append(time.perf_counter() - started)
+                url = response.data['next']
+        for page, page_timings in enumerate(timings, 1):
+            page_timings.sort()
+            self.stdout.write(
+                f'{label}, страница {page}: медиана '
+                f'{page_timings[len(page_timings) // 2] * 1000:.1f} мс'
+            )
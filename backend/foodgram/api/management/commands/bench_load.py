@@ -0,0 +1,161 @@
+import http.client
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_endpoints import percentile
+
+# Каждый такой клиент в сценарии mixed скачивает список покупок,
+# остальные читают рецепты, и в отчет попадают только чтения
+BACKGROUND_EVERY = 4
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенный сервер конкурентными запросами и '
+            'сообщает пропускную способность и хвосты задержек; '
+            'используется для сравнения режимов WSGI и ASGI')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--token', help='токен для эндпоинтов, '
+                            'требующих авторизации')
+        parser.add_argument('--concurrency', type=int, nargs='+',
+                            default=[1, 8, 32, 64])
+        parser.add_argument('--requests', type=int, default=50,
+                            help='запросов на одного клиента')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--save', help='сохранить результаты в JSON')
+        parser.add_argument('--compare', help='JSON с результатами другого '
+                            'режима для сравнения')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = options['timeout']
+        self.headers = {}
+        if options['token']:
+            self.headers['Authorization'] = f'Token {options["token"]}'
+
+        results = {}
+        for name, paths in self.get_scenarios(options['token']).items():
+            results[name] = {}
+            for concurrency in options['concurrency']:
+                metrics = self.run(paths, concurrency, options['requests'])
+                results[name][str(concurrency)] = metrics
+                self.stdout.write(
+                    f'{name} c={concurrency}: ' + ', '.join(
+                        f'{key}={value}' for key, value in metrics.items()))
+
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                self.compare(results, json.load(file))
+
+    def get_scenarios(self, token):
+        status, body = self.fetch_json('/api/recipes/?limit=1')
+        if status != 200 or not body['results']:
+            raise CommandError(
+                'Рецептов нет, заполните базу командой seed_scale')
+        recipe_id = body['results'][0]['id']
+        scenarios = {
+            'tags': ['/api/tags/'],
+            'ingredients': [f'/api/ingredients/?name={quote("а")}'],
+            'recipes.list': ['/api/recipes/'],
+            'recipes.retrieve': [f'/api/recipes/{recipe_id}/'],
+        }
+        if token:
+            scenarios['users.me'] = ['/api/users/me/']
+            scenarios['mixed'] = None
+        return scenarios
+
+    def connect(self):
+        return http.client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout)
+
+    def fetch_json(self, path):
+        connection = self.connect()
+        try:
+            connection.request('GET', path, headers=self.headers)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def client(self, paths, count):
+        connection = self.connect()
+        timings = []
+        errors = 0
+        try:
+            for number in range(count):
+                started = time.perf_counter()
+                try:
+                    connection.request(
+                        'GET', paths[number % len(paths)],
+                        headers=self.headers)
+                    response = connection.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    connection.close()
+                    continue
+                timings.append(time.perf_counter() - started)
+                if response.status >= 400:
+                    errors += 1
+        finally:
+            connection.close()
+        return timings, errors
+
+    def run(self, paths, concurrency, count):
+        clients = []
+        for index in range(concurrency):
+            if paths is not None:
+                clients.append((paths, True))
+            elif index % BACKGROUND_EVERY == BACKGROUND_EVERY - 1:
+                clients.append(
+                    (['/api/recipes/download_shopping_cart/'], False))
+            else:
+                clients.append((['/api/recipes/'], True))
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                (executor.submit(self.client, client_paths, count), measured)
+                for client_paths, measured in clients
+            ]
+            outcomes = [
+                (future.result(), measured) for future, measured in futures]
+        elapsed = time.perf_counter() - started
+        timings = []
+        errors = 0
+        for (client_timings, client_errors), measured in outcomes:
+            errors += client_errors
+            if measured:
+                timings.extend(client_timings)
+        if not timings:
+            raise CommandError('Ни один запрос не выполнен')
+        return {
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50) * 1000, 1),
+            'p95_ms': round(percentile(timings, 95) * 1000, 1),
+            'p99_ms': round(percentile(timings, 99) * 1000, 1),
+            'max_ms': round(max(timings) * 1000, 1),
+            'errors': errors,
+        }
+
+    def compare(self, results, other):
+        self.stdout.write('сценарий c: rps текущий/другой, '
+                          'p99_ms текущий/другой')
+        for name, levels in results.items():
+            for concurrency, metrics in levels.items():
+                expected = other.get(name, {}).get(concurrency)
+                if expected is None:
+                    continue
+                self.stdout.write(
+                    f'{name} c={concurrency}: '
+                    f'{metrics["rps"]}/{expected["rps"]}, '
+                    f'{metrics["p99_ms"]}/{expected["p99_ms"]}')
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from users.models import User
+
+PASSWORD = 'bench-login-password'
+
+
+class Command(BaseCommand):
+    help = 'Замеряет число входов в секунду на один рабочий процесс'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50)
+        parser.add_argument(
+            '--iterations', type=int, nargs='+',
+            default=[settings.PASSWORD_HASH_ITERATIONS]
+        )
+
+    def handle(self, *args, **options):
+        for iterations in options['iterations']:
+            with override_settings(PASSWORD_HASH_ITERATIONS=iterations):
+                elapsed = self.measure(options['logins'])
+            self.stdout.write(
+                f'{iterations} итераций: '
+                f'{options["logins"] / elapsed:.1f} входов/с, '
+                f'{elapsed / options["logins"] * 1000:.1f} мс/вход'
+            )
+
+    def measure(self, logins):
+        client = APIClient()
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username='bench_login',
+                email='bench_login@foodgram.ru',
+                password=PASSWORD
+            )
+            payload = {'email': user.email, 'password': PASSWORD}
+            started = time.perf_counter()
+            for _ in range(logins):
+                response = client.post(
+                    '/api/auth/token/login/', payload, format='json')
+                assert response.status_code == 201, response.content
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return elapsed
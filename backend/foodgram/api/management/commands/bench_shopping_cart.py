@@ -0,0 +1,66 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.shopping_cart import EXPORTERS, shopping_cart_rows
+from recipes.models import Ingredient, IngredientsInRecipe, Recipe, ShoppingCart
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Замеряет выгрузку списка покупок для большой корзины'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if len(ingredient_ids) < options['ingredients']:
+            raise CommandError('В каталоге недостаточно ингредиентов')
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            user = self.fill_cart(rng, ingredient_ids, options)
+            for export_format, (exporter, _) in EXPORTERS.items():
+                tracemalloc.start()
+                started = time.perf_counter()
+                size = sum(
+                    len(chunk.encode())
+                    for chunk in exporter(shopping_cart_rows(user))
+                )
+                elapsed = time.perf_counter() - started
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(
+                    f'{export_format}: {elapsed * 1000:.1f} мс, '
+                    f'{size} байт, пик памяти {peak / 1024:.0f} КиБ'
+                )
+            transaction.set_rollback(True)
+
+    def fill_cart(self, rng, ingredient_ids, options):
+        user = User.objects.create(
+            username='bench_shopping_cart',
+            email='bench_shopping_cart@foodgram.ru'
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=user, name=f'Рецепт {number}', text='-',
+                   cooking_time=1, image='recipes/bench.png')
+            for number in range(options['recipes'])
+        )
+        if recipes[0].pk is None:
+            recipes = list(Recipe.objects.filter(author=user))
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(recipe=recipe, ingredient_id=ingredient_id,
+                                amount=rng.randint(1, 500))
+            for recipe in recipes
+            for ingredient_id in rng.sample(ingredient_ids,
+                                            options['ingredients'])
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=user, recipe=recipe) for recipe in recipes
+        )
+        return user
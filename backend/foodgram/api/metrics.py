@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+from foodgram.db import pool
+from recipes import membership
+from users.token_cache import token_cache
+
+from .db import observe_queries
+from .middleware import AsyncCapableMiddleware
+from .profiling import describe_view
+
+# В многопроцессном режиме метрики пишут файлы в этот каталог уже при
+# импорте; gunicorn создает его в on_starting, а manage.py — нет
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    ['handler', 'method'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+REQUESTS = Counter(
+    'foodgram_requests',
+    'Обработанные запросы',
+    ['handler', 'method', 'status']
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_queries',
+    'Запросы к базе данных на один HTTP-запрос',
+    ['handler'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Размер тела ответа',
+    ['handler'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576)
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кэшам приложения',
+    ['cache', 'result']
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'foodgram_requests_in_progress',
+    'Запросы, которые обрабатываются сейчас',
+    multiprocess_mode='livesum'
+)
+DB_CONNECTIONS = Gauge(
+    'foodgram_db_connections',
+    'Соединения пула БД по состоянию',
+    ['state'],
+    multiprocess_mode='livesum'
+)
+DB_CONNECTION_EVENTS = Counter(
+    'foodgram_db_connection_events',
+    'Открытия соединений с БД, переподключения после проверки и '
+    'ожидания свободного соединения пула',
+    ['event']
+)
+WORKER_THREADS = Gauge(
+    'foodgram_worker_threads',
+    'Потоки обработки запросов во всех рабочих процессах',
+    multiprocess_mode='livesum'
+)
+
+CACHE_STATS = {
+    'recipe_membership': membership.stats,
+    'auth_token': token_cache.stats,
+}
+
+_seen = {}
+_seen_lock = threading.Lock()
+
+
+def sync_cache_stats():
+    """Переносит прирост счетчиков кэшей процесса в метрики"""
+    for name, stats in CACHE_STATS.items():
+        current = stats()
+        with _seen_lock:
+            seen = _seen.setdefault(name, {})
+            for result, value in current.items():
+                delta = value - seen.get(result, 0)
+                if delta > 0:
+                    CACHE_REQUESTS.labels(name, result).inc(delta)
+                    seen[result] = value
+
+
+def sync_db_stats():
+    """Переносит состояние пула соединений процесса в метрики"""
+    current = pool.stats()
+    DB_CONNECTIONS.labels('in_use').set(current.pop('in_use'))
+    DB_CONNECTIONS.labels('idle').set(current.pop('idle'))
+    with _seen_lock:
+        seen = _seen.setdefault('db', {})
+        for event, value in current.items():
+            delta = value - seen.get(event, 0)
+            if delta > 0:
+                DB_CONNECTION_EVENTS.labels(event).inc(delta)
+                seen[event] = value
+
+
+def handler_name(request):
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    view_name, action = describe_view(match.func, request.method)
+    if action:
+        return f'{view_name}.{action}'
+    return view_name
+
+
+class QueryCounter:
+    """Execute-обертка, которая считает SQL-запросы HTTP-запроса"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Метрики задержки, числа SQL-запросов и размера ответов по вьюхам"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        WORKER_THREADS.set(settings.METRICS_WORKER_THREADS)
+
+    def call(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        started = time.perf_counter()
+        queries = QueryCounter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            with observe_queries(queries):
+                response = self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+        return self.finish(request, response, started, queries.count)
+
+    async def acall(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        queries = QueryCounter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            with observe_queries(queries):
+                response = await self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+        return self.finish(request, response, started, queries.count)
+
+    def finish(self, request, response, started, queries):
+        handler = handler_name(request)
+        if handler == 'metrics_view':
+            return response
+        REQUEST_LATENCY.labels(handler, request.method).observe(
+            time.perf_counter() - started)
+        REQUESTS.labels(
+            handler, request.method, str(response.status_code)).inc()
+        if not response.streaming:
+            RESPONSE_SIZE.labels(handler).observe(len(response.content))
+        REQUEST_QUERIES.labels(handler).observe(queries)
+        sync_cache_stats()
+        sync_db_stats()
+        return response
+
+
+def metrics_view(request):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
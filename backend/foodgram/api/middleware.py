@@ -0,0 +1,31 @@
+import asyncio
+
+
+class AsyncCapableMiddleware:
+    """Прослойка, которая работает и в WSGI, и в ASGI.
+
+    В режиме ASGI синхронная прослойка заставила бы Django выполнять
+    всю цепочку обработки в единственном потоке для синхронного кода,
+    поэтому подклассы реализуют оба варианта: call и acall.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так же Django помечает асинхронные MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def acall(self, request):
+        raise NotImplementedError
@@ -0,0 +1,135 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from foodgram.db.router import replica_reads
+from recipes.catalog import get_catalog_version
+
+from .db import iterate_in_db_pool, run_in_db_pool
+from .replicas import stick_to_primary
+
+
+def _render(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    if not response.streaming and hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def asgi_view(view):
+    """В режиме ASGI превращает вьюху в асинхронную, которая выполняет
+    обработку и рендер ответа в пуле потоков БД"""
+    if not settings.ASYNC_VIEWS:
+        return view
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        response = await run_in_db_pool(
+            _render, view, request, *args, **kwargs)
+        if response.streaming:
+            # Обращаться к базе в цикле событий нельзя, поэтому каждую
+            # часть потокового ответа foodgram.asgi.ASGIHandler получает
+            # в пуле потоков БД
+            response.async_streaming_content = iterate_in_db_pool(
+                response.streaming_content)
+        return response
+
+    return async_view
+
+
+class AsyncViewMixin:
+    """Вьюха, которая в режиме ASGI не занимает поток цикла событий"""
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        return asgi_view(super().as_view(*args, **kwargs))
+
+
+class StickyWritesMixin:
+    """После успешных изменений из sticky_actions пользователь какое-то
+    время читает с основной базы, а не с реплик"""
+
+    sticky_actions = ()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        token = getattr(request.auth, 'key', None)
+        if (getattr(self, 'action', None) in self.sticky_actions
+                and token is not None and response.status_code < 400):
+            stick_to_primary(token)
+        return response
+
+
+class CatalogConditionalGetMixin:
+    """Условные GET-запросы (ETag/Last-Modified) к справочникам.
+
+    Версия справочника меняется при сохранении и удалении его записей,
+    поэтому на If-None-Match отвечается кодом 304 после одного запроса
+    версии по первичному ключу, а сериализованные данные кэшируются
+    в процессе для каждой версии. И версия, и данные читаются с основной
+    базы.
+    """
+
+    catalog = None
+    catalog_version = None
+    body_cache_size = 256
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._body_cache = OrderedDict()
+        cls._body_cache_lock = threading.Lock()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        self.catalog_version = get_catalog_version(self.catalog)
+        token, modified = self.catalog_version
+        representation = (f'{token}:{request.get_full_path()}:'
+                          f'{request.accepted_media_type}')
+        etag = quote_etag(
+            hashlib.md5(representation.encode()).hexdigest())
+        last_modified = int(modified.timestamp())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            data = self.get_cached_body(etag)
+            if data is None:
+                # Тело кэшируется под версией с основной базы, поэтому и
+                # читается оттуда: отстающая реплика вернула бы старые
+                # записи под новым ETag
+                with replica_reads(False):
+                    data = handler(request, *args, **kwargs).data
+                data = list(data) if isinstance(data, list) else dict(data)
+                self.set_cached_body(etag, data)
+            response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    def get_cached_body(self, etag):
+        with self._body_cache_lock:
+            data = self._body_cache.get(etag)
+            if data is not None:
+                self._body_cache.move_to_end(etag)
+            return data
+
+    def set_cached_body(self, etag, data):
+        with self._body_cache_lock:
+            self._body_cache[etag] = data
+            while len(self._body_cache) > self.body_cache_size:
+                self._body_cache.popitem(last=False)
@@ -1,7 +1,69 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+EXACT_COUNT_THRESHOLD = 1000
+
+
+class ApproximateCountPaginator(Paginator):
+    """Пагинатор с оценкой количества строк по плану запроса PostgreSQL"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[getattr(queryset, 'db', 'default')]
+        if connection.vendor != 'postgresql' or not hasattr(queryset, 'query'):
+            return super().count
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+class KeysetPagination(CursorPagination):
+    """Пагинация по ключу: стоимость страницы не зависит от ее глубины"""
+
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
 
 
 class CustomPagination(PageNumberPagination):
-    """Молель пагинации"""
+    """Молель пагинации.
+
+    По умолчанию постраничная, с параметром cursor переключается на
+    пагинацию по ключу, а count=approximate заменяет COUNT(*) оценкой.
+    """
 
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    keyset_pagination_class = KeysetPagination
+
+    keyset_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (self.cursor_query_param in request.query_params
+                and hasattr(queryset, 'order_by')):
+            self.keyset_paginator = self.keyset_pagination_class()
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view)
+        if request.query_params.get(self.count_query_param) == 'approximate':
+            self.django_paginator_class = ApproximateCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
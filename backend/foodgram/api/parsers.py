@@ -0,0 +1,29 @@
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework import exceptions, status
+from rest_framework.parsers import JSONParser
+
+
+class PayloadTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Размер запроса превышает допустимый'
+    default_code = 'payload_too_large'
+
+
+class BoundedJSONParser(JSONParser):
+    """JSON-парсер, отклоняющий слишком большие запросы до их чтения"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        limit = settings.RECIPE_UPLOAD_MAX_SIZE
+        request = parser_context['request']
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > limit:
+            raise PayloadTooLarge()
+        body = stream.read(limit + 1)
+        if len(body) > limit:
+            raise PayloadTooLarge()
+        return super().parse(BytesIO(body), media_type, parser_context)
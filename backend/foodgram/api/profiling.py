@@ -0,0 +1,186 @@
+import contextvars
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .db import observe_queries
+from .middleware import AsyncCapableMiddleware
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """Время, потраченное запросом на SQL, вьюху, сериализацию и рендер.
+
+    Число и время SQL-запросов и общее время считаются всегда; разбивка
+    на вьюху, сериализацию и рендер — только для детальных профилей.
+    """
+
+    def __init__(self, detailed=False):
+        self.started = time.perf_counter()
+        self.detailed = detailed
+        self.view_name = None
+        self.action = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.view_started = None
+        self.view_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.render_time = 0.0
+        self.total_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def activate(self):
+        token = _current.set(self)
+        try:
+            with observe_queries(self.record_query):
+                yield
+        finally:
+            _current.reset(token)
+
+    def server_timing(self):
+        metrics = [
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"'
+        ]
+        if self.detailed:
+            metrics += [
+                f'view;dur={self.view_time * 1000:.1f}',
+                f'serializer;dur={self.serializer_time * 1000:.1f}',
+                f'render;dur={self.render_time * 1000:.1f}',
+            ]
+        metrics.append(f'total;dur={self.total_time * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def describe_view(view_func, method):
+    """Имя класса вьюхи и действие вьюсета для HTTP-метода"""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return view_func.__name__, None
+    actions = getattr(view_func, 'actions', None) or {}
+    return view_class.__name__, actions.get(method.lower())
+
+
+@contextmanager
+def measure_serialization():
+    """Учитывает время верхнеуровневого serializer.data"""
+    profile = _current.get()
+    if profile is None or not profile.detailed:
+        yield
+        return
+    profile.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serializer_depth -= 1
+        if not profile.serializer_depth:
+            profile.serializer_time += time.perf_counter() - started
+
+
+class ProfiledSerializerMixin:
+    """Сериализатор, время получения data которого попадает в профиль"""
+
+    @property
+    def data(self):
+        with measure_serialization():
+            return super().data
+
+
+class ProfiledListSerializer(ProfiledSerializerMixin,
+                             serializers.ListSerializer):
+    pass
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """Заголовок Server-Timing и выборочный структурированный лог запросов.
+
+    Для доли запросов PROFILING_LOG_SAMPLE_RATE профиль детальный и
+    пишется в лог, для остальных заголовок содержит только SQL и общее
+    время.
+    """
+
+    @staticmethod
+    def new_profile():
+        return RequestProfile(
+            detailed=random.random() < settings.PROFILING_LOG_SAMPLE_RATE)
+
+    def call(self, request):
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+        profile = self.new_profile()
+        with profile.activate():
+            response = self.get_response(request)
+        return self.finish(request, response, profile)
+
+    async def acall(self, request):
+        if not settings.PROFILING_ENABLED:
+            return await self.get_response(request)
+        profile = self.new_profile()
+        with profile.activate():
+            response = await self.get_response(request)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        finished = time.perf_counter()
+        profile.total_time = finished - profile.started
+        if profile.view_started is not None and not profile.view_time:
+            profile.view_time = finished - profile.view_started
+        response['Server-Timing'] = profile.server_timing()
+        if profile.detailed:
+            self.log(request, response, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _current.get()
+        if profile is None or not profile.detailed:
+            return
+        profile.view_name, profile.action = describe_view(
+            view_func, request.method)
+        profile.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        profile = _current.get()
+        if profile is not None and profile.view_started is not None:
+            view_finished = time.perf_counter()
+            profile.view_time = view_finished - profile.view_started
+            response.add_post_render_callback(
+                lambda rendered: self.rendered(profile, view_finished))
+        return response
+
+    @staticmethod
+    def rendered(profile, view_finished):
+        profile.render_time = time.perf_counter() - view_finished
+
+    def log(self, request, response, profile):
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'url_name': match.url_name if match else None,
+            'view': profile.view_name,
+            'action': profile.action,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'sql_ms': round(profile.sql_time * 1000, 2),
+            'view_ms': round(profile.view_time * 1000, 2),
+            'serializer_ms': round(profile.serializer_time * 1000, 2),
+            'render_ms': round(profile.render_time * 1000, 2),
+            'total_ms': round(profile.total_time * 1000, 2),
+        }, ensure_ascii=False))
@@ -0,0 +1,188 @@
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from django.conf import settings
+
+from .db import observe_queries
+from .middleware import AsyncCapableMiddleware
+
+logger = logging.getLogger(__name__)
+
+MAX_SLOW_FINGERPRINTS = 1000
+STACK_DEPTH = 8
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'(?:(?:%s|\?)\s*,\s*)+(?:%s|\?)')
+_SPACES = re.compile(r'\s+')
+
+
+class NPlusOneError(Exception):
+    """Один и тот же запрос повторился в HTTP-запросе слишком много раз"""
+
+
+def fingerprint(sql):
+    """SQL без литералов: запросы, отличающиеся только параметрами, совпадают"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('...', sql.replace('%s', '?'))
+    return _SPACES.sub(' ', sql).strip()
+
+
+def serializer_field():
+    """Ближайшее по стеку поле сериализатора DRF, например
+    RecipeReadSerializer.author"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if (code.co_name == 'to_representation'
+                and code.co_filename.endswith(
+                    ('rest_framework/serializers.py',
+                     'rest_framework\\serializers.py'))
+                and 'field' in frame.f_locals):
+            serializer = frame.f_locals.get('self')
+            field = frame.f_locals['field']
+            return f'{type(serializer).__name__}.{field.field_name}'
+        frame = frame.f_back
+    return None
+
+
+def app_stack():
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(base_dir)
+        and not frame.filename.endswith('querywatch.py')
+    ]
+    return traceback.format_list(frames[-STACK_DEPTH:])
+
+
+class SlowQueryLog:
+    """Медленные запросы процесса, сгруппированные по отпечатку"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._reported = time.monotonic()
+
+    def add(self, sql, elapsed):
+        key = fingerprint(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= MAX_SLOW_FINGERPRINTS:
+                    del self._entries[min(
+                        self._entries, key=lambda k: self._entries[k][1])]
+                entry = self._entries[key] = [0, 0.0, 0.0, sql]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+    def top(self, limit):
+        with self._lock:
+            entries = sorted(self._entries.items(),
+                             key=lambda item: item[1][1], reverse=True)
+        return [
+            {
+                'fingerprint': key,
+                'count': count,
+                'total_ms': round(total * 1000, 1),
+                'max_ms': round(longest * 1000, 1),
+                'example': example,
+            }
+            for key, (count, total, longest, example) in entries[:limit]
+        ]
+
+    def report_if_due(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._reported < settings.SLOW_QUERY_REPORT_INTERVAL:
+                return
+            self._reported = now
+        top = self.top(settings.SLOW_QUERY_TOP_N)
+        if top:
+            logger.warning(json.dumps(
+                {'slow_queries': top}, ensure_ascii=False))
+
+
+slow_queries = SlowQueryLog()
+
+
+class QueryWatch:
+    """Обертка execute: учет медленных запросов и поиск N+1"""
+
+    def __init__(self, request, detect):
+        self.request = request
+        self.detect = detect
+        self.counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed = time.perf_counter() - started
+        if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            slow_queries.add(sql, elapsed)
+        if self.detect:
+            key = fingerprint(sql)
+            self.counts[key] += 1
+            if self.counts[key] == settings.QUERY_WATCH_REPEAT_THRESHOLD + 1:
+                self.repeated(key)
+        return result
+
+    def repeated(self, key):
+        field = serializer_field()
+        stack = app_stack()
+        message = (
+            f'Запрос повторился более '
+            f'{settings.QUERY_WATCH_REPEAT_THRESHOLD} раз в '
+            f'{self.request.method} {self.request.path}'
+            + (f' (поле {field})' if field else '')
+            + f': {key}'
+        )
+        if settings.QUERY_WATCH_RAISE:
+            raise NPlusOneError(message + '\n' + ''.join(stack))
+        logger.warning(json.dumps({
+            'n_plus_one': key,
+            'method': self.request.method,
+            'path': self.request.path,
+            'serializer_field': field,
+            'stack': stack,
+        }, ensure_ascii=False))
+
+
+class QueryWatchMiddleware(AsyncCapableMiddleware):
+    """Поиск N+1 и медленных запросов.
+
+    При QUERY_WATCH_RAISE проверяется каждый запрос и повтор вызывает
+    NPlusOneError, иначе проверяется доля QUERY_WATCH_SAMPLE_RATE
+    запросов и повтор пишется в лог.
+    """
+
+    def call(self, request):
+        if not settings.QUERY_WATCH_ENABLED:
+            return self.get_response(request)
+        with observe_queries(self.watch(request)):
+            response = self.get_response(request)
+        slow_queries.report_if_due()
+        return response
+
+    async def acall(self, request):
+        if not settings.QUERY_WATCH_ENABLED:
+            return await self.get_response(request)
+        with observe_queries(self.watch(request)):
+            response = await self.get_response(request)
+        slow_queries.report_if_due()
+        return response
+
+    @staticmethod
+    def watch(request):
+        detect = (settings.QUERY_WATCH_RAISE
+                  or random.random() < settings.QUERY_WATCH_SAMPLE_RATE)
+        return QueryWatch(request, detect)
@@ -0,0 +1,23 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class TextRenderer(BaseRenderer):
+    """Рендерер для выгрузок в текстовом виде"""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class CSVRenderer(TextRenderer):
+    """Рендерер для выгрузок в формате CSV"""
+
+    media_type = 'text/csv'
+    format = 'csv'
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import HTTP_HEADER_ENCODING
+from rest_framework.authentication import get_authorization_header
+
+from foodgram.db.router import replica_reads
+
+from .middleware import AsyncCapableMiddleware
+
+STICKY_KEY = 'db_primary:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def request_token(request):
+    """Ключ токена из заголовка Authorization без обращения к базе"""
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b'token':
+        return None
+    return auth[1].decode(HTTP_HEADER_ENCODING, errors='replace')
+
+
+def stick_to_primary(token):
+    """Следующие REPLICA_STICKY_SECONDS секунд запросы с этим токеном
+    читают с основной базы и видят только что сделанные изменения"""
+    if settings.DATABASE_REPLICAS and settings.REPLICA_STICKY_SECONDS:
+        cache.set(STICKY_KEY.format(token), True,
+                  settings.REPLICA_STICKY_SECONDS)
+
+
+def can_read_replica(request):
+    if request.method not in SAFE_METHODS:
+        return False
+    token = request_token(request)
+    return token is None or not cache.get(STICKY_KEY.format(token))
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """Разрешает безопасным запросам читать с реплик, кроме запросов
+    пользователей, недавно что-то изменивших"""
+
+    def call(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        with replica_reads(can_read_replica(request)):
+            return self.get_response(request)
+
+    async def acall(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        with replica_reads(can_read_replica(request)):
+            return await self.get_response(request)
@@ -1,42 +1,59 @@
+from django.db import transaction
 from djoser.serializers import (CurrentPasswordSerializer, PasswordSerializer,
                                 UserCreateSerializer, UserSerializer)
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import status
 from rest_framework import exceptions, serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.authtoken.models import Token
 
+from .fields import RecipeImageField
+from .profiling import ProfiledListSerializer, ProfiledSerializerMixin
 from users.models import User, Subscription
-from recipes.models import (Ingredient, Recipe, IngredientsInRecipe, Tag,
-                            Favorite, ShoppingCart)
+from recipes.images import DETAIL, THUMBNAIL, schedule_renditions
+from recipes.membership import FAVORITES, SHOPPING_CART, get_recipe_ids
+from recipes.recipe_index import mark_changed
+from recipes.models import Ingredient, Recipe, IngredientsInRecipe, Tag
 
 
 MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 1440
+LIST_ACTIONS = ('list', 'feed', 'what_to_cook')
 
 
-class GetTokenSerializer(serializers.ModelSerializer):
+def image_url(recipe, rendition, request=None):
+    """Адрес копии изображения рецепта, если она готова, иначе оригинала"""
+    name = recipe.image_renditions.get(rendition) or recipe.image.name
+    url = recipe.image.storage.url(name)
+    if request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit', '')
+    if recipes_limit.isdigit():
+        return int(recipes_limit)
+    return None
+
+
+class GetTokenSerializer(ProfiledSerializerMixin,
+                         serializers.ModelSerializer):
     """Сериализатор для получения токена"""
     email = serializers.EmailField(max_length=254)
     token = serializers.SerializerMethodField()
 
     def get_token(self, obj):
-        email = list(obj.items())[0][1]
-        user = User.objects.get(
-            email=email
-        )
-        token, created = Token.objects.get_or_create(user=user)
+        token, created = Token.objects.get_or_create(user=obj['user'])
         return token.key
 
     def validate(self, data):
-        email = data['email']
-        password = data['password']
         try:
-            user = User.objects.get(email=email)
-        except Exception:
+            user = User.objects.get(email=data['email'])
+        except User.DoesNotExist:
             raise exceptions.AuthenticationFailed('Введенные данные не верные')
-        if not user.check_password(password):
+        if not user.check_password(data['password']):
             raise exceptions.AuthenticationFailed('Введенные данные не верные')
+        data['user'] = user
         return data
 
     class Meta:
@@ -44,7 +61,8 @@ class GetTokenSerializer(serializers.ModelSerializer):
         fields = ('email', 'password', 'token')
 
 
-class CustomUserCreateSerializer(UserCreateSerializer):
+class CustomUserCreateSerializer(ProfiledSerializerMixin,
+                                 UserCreateSerializer):
     """Сериализатор для регистрации новых пользователей"""
 
     class Meta:
@@ -54,7 +72,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         ]
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(ProfiledSerializerMixin, UserSerializer):
     """Сериализатор для отображения информации о пользователях"""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -65,8 +83,12 @@ class CustomUserSerializer(UserSerializer):
             'email', 'id', 'username', 'first_name', 'last_name',
             'is_subscribed'
         ]
+        list_serializer_class = ProfiledListSerializer
 
     def get_is_subscribed(self, obj):
+        is_subscribed = getattr(obj, 'is_subscribed', None)
+        if is_subscribed is not None:
+            return is_subscribed
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
@@ -84,7 +106,7 @@ class SubscriptionSerializer(CustomUserSerializer):
     """Сериализатор для подписки на других авторов"""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -92,6 +114,7 @@ class SubscriptionSerializer(CustomUserSerializer):
             'email', 'id', 'username', 'first_name', 'last_name',
             'is_subscribed', 'recipes', 'recipes_count',
         ]
+        list_serializer_class = ProfiledListSerializer
 
     def validate(self, data):
         author = self.instance
@@ -118,32 +141,31 @@ class SubscriptionSerializer(CustomUserSerializer):
         return data
 
     def get_recipes(self, obj):
-        recipes_limit = self.context['request'].GET.get('recipes_limit')
-        if recipes_limit:
-            recipes = obj.recipes.all()[:int(recipes_limit)]
-        else:
-            recipes = obj.recipes.all()
-        return RecipeSubscriptionSerializer(recipes,
-                                            many=True, read_only=True).data
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes_limit = get_recipes_limit(self.context['request'])
+            recipes = obj.recipes.all()[:recipes_limit]
+        return RecipeSubscriptionSerializer(
+            recipes, many=True, read_only=True, context=self.context).data
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Сериализатор тегов"""
 
     class Meta:
         model = Tag
         fields = '__all__'
+        list_serializer_class = ProfiledListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(ProfiledSerializerMixin,
+                           serializers.ModelSerializer):
     """Сериализатор ингредиентов"""
 
     class Meta:
         model = Ingredient
         fields = '__all__'
+        list_serializer_class = ProfiledListSerializer
 
 
 class IngredientsInRecipeSerializer(serializers.ModelSerializer):
@@ -159,16 +181,43 @@ class IngredientsInRecipeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'measurement_unit', 'amount']
 
 
+class IngredientPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """Поле ингредиента, использующее заранее загруженные объекты"""
+
+    def to_internal_value(self, data):
+        preloaded = getattr(self.parent.parent, 'preloaded_ingredients', {})
+        if str(data) in preloaded:
+            return preloaded[str(data)]
+        return super().to_internal_value(data)
+
+
+class IngredientsDuringRecipeListSerializer(serializers.ListSerializer):
+    """Список ингредиентов рецепта, загружаемых из базы одним запросом"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            ingredient_ids = {
+                str(item.get('id')) for item in data
+                if isinstance(item, dict) and str(item.get('id')).isdigit()
+            }
+            self.preloaded_ingredients = {
+                str(pk): ingredient for pk, ingredient
+                in Ingredient.objects.in_bulk(ingredient_ids).items()
+            }
+        return super().to_internal_value(data)
+
+
 class IngredientsDuringRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения ингредиентов в процессе создания рецепта"""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = IngredientPrimaryKeyField(
         source='ingredient', queryset=Ingredient.objects.all()
     )
 
     class Meta:
         model = IngredientsInRecipe
         fields = ['id', 'amount']
+        list_serializer_class = IngredientsDuringRecipeListSerializer
 
     def to_representation(self, instance):
         request = self.context.get('request')
@@ -176,7 +225,8 @@ class IngredientsDuringRecipeSerializer(serializers.ModelSerializer):
         return IngredientsInRecipeSerializer(instance, context=context).data
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(ProfiledSerializerMixin,
+                           serializers.ModelSerializer):
     """Сериализатор для просмотра рецептов"""
 
     tags = TagSerializer(many=True)
@@ -185,36 +235,61 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         many=True, source='ingredientsinrecipe')
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = [
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time',
+            'is_in_shopping_cart', 'name', 'image', 'image_renditions',
+            'text', 'cooking_time',
         ]
+        list_serializer_class = ProfiledListSerializer
+
+    def to_representation(self, instance):
+        author_subscribed = getattr(instance, 'author_subscribed', None)
+        if author_subscribed is not None:
+            instance.author.is_subscribed = author_subscribed
+        return super().to_representation(instance)
+
+    def get_user_recipe_ids(self, kind):
+        key = f'{kind}_recipe_ids'
+        if key not in self.context:
+            request = self.context.get('request')
+            user = getattr(request, 'user', None)
+            self.context[key] = get_recipe_ids(user, kind)
+        return self.context[key]
 
     def get_is_favorited(self, obj):
-        user = None
-        request = self.context.get("request")
-        if request and hasattr(request, "user"):
-            user = request.user
-        existing = Favorite.objects.filter(
-            user=user.id,
-            recipe=obj
-        ).exists()
-        return existing
+        return obj.id in self.get_user_recipe_ids(FAVORITES)
 
     def get_is_in_shopping_cart(self, obj):
-        user = None
-        request = self.context.get("request")
-        if request and hasattr(request, "user"):
-            user = request.user
-        existing = ShoppingCart.objects.filter(
-            user=user.id,
-            recipe=obj
-        ).exists()
-        return existing
+        return obj.id in self.get_user_recipe_ids(SHOPPING_CART)
+
+    def get_image(self, obj):
+        view = self.context.get('view')
+        if getattr(view, 'action', None) in LIST_ACTIONS:
+            rendition = THUMBNAIL
+        else:
+            rendition = DETAIL
+        return image_url(obj, rendition, self.context.get('request'))
+
+    def get_image_renditions(self, obj):
+        request = self.context.get('request')
+        renditions = {'original': image_url(obj, None, request)}
+        for rendition in obj.image_renditions:
+            renditions[rendition] = image_url(obj, rendition, request)
+        return renditions
+
+
+class RecipeMatchSerializer(RecipeReadSerializer):
+    """Сериализатор рецептов, подобранных по имеющимся ингредиентам"""
+
+    matched_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + ['matched_ingredients']
 
 
 class RecipeCreateSerializer(RecipeReadSerializer):
@@ -225,7 +300,7 @@ class RecipeCreateSerializer(RecipeReadSerializer):
     ingredients = IngredientsDuringRecipeSerializer(
         source='ingredientsinrecipe', many=True)
     author = CustomUserSerializer(read_only=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -247,58 +322,88 @@ class RecipeCreateSerializer(RecipeReadSerializer):
 
         return cooking_time
 
+    def validate_ingredients(self, ingredients):
+        ingredient_ids = [item['ingredient'].id for item in ingredients]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError(
+                'Ингредиенты в рецепте не должны повторяться!')
+        return ingredients
+
     def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            IngredientsInRecipe.objects.create(
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(
                 recipe=recipe,
                 ingredient=ingredient.get('ingredient'),
                 amount=ingredient.get('amount'),
             )
-
+            for ingredient in ingredients
+        )
+        mark_changed(recipe.id)
+
+    def update_ingredients(self, ingredients, recipe):
+        existing = {
+            item.ingredient_id: item
+            for item in recipe.ingredientsinrecipe.all()
+        }
+        to_create = []
+        to_update = []
+        for ingredient in ingredients:
+            item = existing.pop(ingredient['ingredient'].id, None)
+            if item is None:
+                to_create.append(ingredient)
+            elif item.amount != ingredient['amount']:
+                item.amount = ingredient['amount']
+                to_update.append(item)
+        if existing:
+            IngredientsInRecipe.objects.filter(
+                id__in=[item.id for item in existing.values()]
+            ).delete()
+        if to_update:
+            IngredientsInRecipe.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            self.create_ingredients(to_create, recipe)
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredientsinrecipe')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        schedule_renditions(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         if 'ingredientsinrecipe' in validated_data:
-            ingredients = validated_data.pop('ingredientsinrecipe')
-            if 'ingredientsinrecipe':
-                recipe.ingredients.clear()
-            RecipeCreateSerializer.create_ingredients(
-                self, ingredients, recipe
-            )
-        return super().update(recipe, validated_data)
+            self.update_ingredients(
+                validated_data.pop('ingredientsinrecipe'), recipe)
+        if 'tags' in validated_data:
+            recipe.tags.set(validated_data.pop('tags'))
+        if 'image' in validated_data:
+            recipe.image_renditions = {}
+        recipe = super().update(recipe, validated_data)
+        if 'image' in validated_data:
+            schedule_renditions(recipe)
+        return recipe
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.for_read(
+            getattr(request, 'user', None)).get(pk=instance.pk)
         return RecipeReadSerializer(instance, context=context).data
 
 
-class RecipeSubscriptionSerializer(serializers.ModelSerializer):
+class RecipeSubscriptionSerializer(ProfiledSerializerMixin,
+                                   serializers.ModelSerializer):
     """Сериализатор подписок"""
-    id = serializers.SerializerMethodField()
-    name = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
-    cooking_time = serializers.SerializerMethodField()
 
     class Meta:
-        model = Favorite
+        model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
-
-    def get_id(self, obj):
-        return obj.recipe.id
-
-    def get_name(self, obj):
-        return obj.recipe.name
+        list_serializer_class = ProfiledListSerializer
 
     def get_image(self, obj):
-        request = self.context.get('request')
-        return request.build_absolute_uri(obj.recipe.image)
-
-    def get_cooking_time(self, obj):
-        return obj.recipe.cooking_time
+        return image_url(obj, THUMBNAIL, self.context.get('request'))
@@ -0,0 +1,80 @@
+import csv
+import json
+
+from django.db.models import Q, Sum
+
+from recipes.models import IngredientsInRecipe
+
+CHUNK_SIZE = 2000
+
+
+def shopping_cart_rows(user):
+    """Суммарное количество каждого ингредиента из корзины пользователя.
+
+    Строки читаются страницами по CHUNK_SIZE, каждая — отдельным
+    запросом после последней прочитанной строки, поэтому между
+    страницами не остается открытого курсора и перебор можно
+    продолжать в другом потоке.
+    """
+    rows = IngredientsInRecipe.objects.filter(
+        recipe__shopping__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        amount=Sum('amount')
+    ).order_by(
+        'ingredient__name', 'ingredient__measurement_unit'
+    )
+    page = rows
+    while True:
+        batch = list(page[:CHUNK_SIZE])
+        yield from batch
+        if len(batch) < CHUNK_SIZE:
+            return
+        name = batch[-1]['ingredient__name']
+        unit = batch[-1]['ingredient__measurement_unit']
+        page = rows.filter(
+            Q(ingredient__name__gt=name)
+            | Q(ingredient__name=name, ingredient__measurement_unit__gt=unit)
+        )
+
+
+def export_txt(rows):
+    for row in rows:
+        yield (f'{row["ingredient__name"]} '
+               f'({row["ingredient__measurement_unit"]}) — '
+               f'{row["amount"]}\n')
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['name', 'measurement_unit', 'amount'])
+    for row in rows:
+        yield writer.writerow([row['ingredient__name'],
+                               row['ingredient__measurement_unit'],
+                               row['amount']])
+
+
+def export_json(rows):
+    separator = '\n'
+    yield '['
+    for row in rows:
+        yield separator + json.dumps({
+            'name': row['ingredient__name'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+            'amount': row['amount'],
+        }, ensure_ascii=False)
+        separator = ',\n'
+    yield '\n]\n'
+
+
+EXPORTERS = {
+    'txt': (export_txt, 'text/plain; charset=utf-8'),
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+    'json': (export_json, 'application/json'),
+}
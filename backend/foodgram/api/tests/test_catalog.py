@@ -0,0 +1,41 @@
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Tag
+
+from .utils import clear_caches
+
+
+class CatalogConditionalGetTest(APITestCase):
+    """ETag справочника зависит от версии в базе, а не в кэше процесса"""
+
+    def get_tags(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/tags/', **headers)
+
+    def test_not_modified_until_catalog_changes(self):
+        etag = self.get_tags()['ETag']
+        clear_caches()
+        self.assertEqual(self.get_tags(etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Завтрак', color='#E26C2D',
+                               slug='breakfast')
+        response = self.get_tags(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), 1)
+
+
+class IngredientSearchQueriesTest(APITestCase):
+    """Поиск по индексу сверяется с той же версией справочника,
+    что и ETag, и больше в базу не ходит"""
+
+    def setUp(self):
+        clear_caches()
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    def test_search_reads_only_catalog_version(self):
+        self.client.get('/api/ingredients/?name=с')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/ingredients/?name=со')
+        self.assertEqual([item['name'] for item in response.data], ['соль'])
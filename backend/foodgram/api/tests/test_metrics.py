@@ -0,0 +1,28 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+from rest_framework.test import APITestCase
+
+from .utils import clear_caches
+
+
+@override_settings(PROFILING_ENABLED=False)
+class RequestQueriesMetricTest(APITestCase):
+    """Число SQL-запросов считается и без профилирования"""
+
+    def setUp(self):
+        clear_caches()
+
+    def observed(self, handler):
+        return REGISTRY.get_sample_value(
+            'foodgram_request_queries_sum', {'handler': handler}) or 0
+
+    def test_queries_are_counted(self):
+        handler = 'TagViewSet.list'
+        before = self.observed(handler)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.observed(handler) - before, len(queries))
+        self.assertGreater(len(queries), 0)
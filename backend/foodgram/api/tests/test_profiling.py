@@ -0,0 +1,50 @@
+import itertools
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.profiling import RequestProfile, measure_serialization
+
+from .utils import clear_caches, create_recipes, create_user
+
+
+class ProfilingTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes(create_user('author'), 2)
+
+    def setUp(self):
+        clear_caches()
+
+    def test_server_timing_by_default(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        metrics = [metric.split(';')[0]
+                   for metric in response['Server-Timing'].split(', ')]
+        self.assertEqual(metrics, ['sql', 'total'])
+
+    @override_settings(PROFILING_LOG_SAMPLE_RATE=1)
+    def test_sampled_request_is_detailed(self):
+        with self.assertLogs('api.profiling'):
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        for metric in ('sql', 'view', 'serializer', 'render', 'total'):
+            self.assertIn(f'{metric};dur=', response['Server-Timing'])
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get('/api/recipes/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_nested_data_is_counted_once(self):
+        profile = RequestProfile(detailed=True)
+        with profile.activate(), mock.patch(
+                'api.profiling.time.perf_counter',
+                side_effect=itertools.count()):
+            with measure_serialization():
+                with measure_serialization():
+                    pass
+        self.assertEqual(profile.serializer_time, 2)
+        self.assertEqual(profile.serializer_depth, 0)
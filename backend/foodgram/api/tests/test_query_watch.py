@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+from .utils import clear_caches, create_recipes, create_user
+
+AUTHORS = 20
+LIST_URLS = (
+    '/api/users/?limit=50',
+    '/api/recipes/?limit=50',
+    '/api/recipes/?limit=50&search=recipe',
+    '/api/recipes/what_to_cook/?limit=50&ingredients={ingredients}',
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/ingredients/?name=ingr',
+)
+AUTHENTICATED_LIST_URLS = LIST_URLS + (
+    '/api/recipes/?limit=50&is_favorited=1',
+    '/api/recipes/?limit=50&is_in_shopping_cart=1',
+    '/api/users/subscriptions/?limit=50',
+    '/api/recipes/feed/?limit=50',
+    '/api/recipes/download_shopping_cart/',
+)
+
+
+class ListQueryWatchTest(APITestCase):
+    """Списки не повторяют запросы для каждой строки страницы:
+    в тестах повтор вызывает NPlusOneError"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        recipes = []
+        for number in range(AUTHORS):
+            author = create_user(f'author{number}')
+            recipes += create_recipes(author, 2)
+            Subscription.objects.create(user=cls.reader, author=author)
+        for recipe in recipes:
+            Favorite.objects.create(user=cls.reader, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+        cls.ingredients = ','.join(
+            str(ingredient.id)
+            for ingredient in recipes[0].ingredients.all())
+
+    def setUp(self):
+        clear_caches()
+
+    def assert_lists(self, urls):
+        for url in urls:
+            url = url.format(ingredients=self.ingredients)
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_raise_is_enabled_for_all_tests(self):
+        self.assertTrue(settings.QUERY_WATCH_ENABLED)
+        self.assertTrue(settings.QUERY_WATCH_RAISE)
+
+    def test_lists_anonymous(self):
+        self.assert_lists(LIST_URLS)
+
+    def test_lists_authenticated(self):
+        self.client.force_authenticate(self.reader)
+        self.assert_lists(AUTHENTICATED_LIST_URLS)
+
+    @override_settings(FEED_MATERIALIZE_THRESHOLD=1)
+    def test_materialized_feed(self):
+        self.client.force_authenticate(self.reader)
+        self.assert_lists(('/api/recipes/feed/?limit=50',))
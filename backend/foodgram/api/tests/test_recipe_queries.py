@@ -0,0 +1,62 @@
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, ShoppingCart
+
+from .utils import clear_caches, create_recipes, create_user
+
+# Страница рецептов: count, рецепты с автором и флагами, теги, ингредиенты
+LIST_QUERIES = 4
+# Аутентифицированному пользователю добавляются id рецептов из избранного
+# и корзины (кэш membership пуст)
+LIST_QUERIES_AUTHENTICATED = LIST_QUERIES + 2
+DETAIL_QUERIES = 3
+DETAIL_QUERIES_AUTHENTICATED = DETAIL_QUERIES + 2
+
+
+class RecipeQueryBudgetTest(APITestCase):
+    """Число запросов к базе не зависит от размера страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        cls.recipes = create_recipes(cls.author, 60)
+        for recipe in cls.recipes[:20]:
+            Favorite.objects.create(user=cls.reader, recipe=recipe)
+        for recipe in cls.recipes[10:30]:
+            ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+
+    def setUp(self):
+        clear_caches()
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_anonymous(self):
+        for limit in (6, 50):
+            with self.subTest(limit=limit):
+                clear_caches()
+                response = self.get(
+                    f'/api/recipes/?limit={limit}', LIST_QUERIES)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_authenticated(self):
+        self.client.force_authenticate(self.reader)
+        for limit in (6, 50):
+            with self.subTest(limit=limit):
+                clear_caches()
+                response = self.get(f'/api/recipes/?limit={limit}',
+                                    LIST_QUERIES_AUTHENTICATED)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_detail_anonymous(self):
+        self.get(f'/api/recipes/{self.recipes[0].id}/', DETAIL_QUERIES)
+
+    def test_detail_authenticated(self):
+        self.client.force_authenticate(self.reader)
+        response = self.get(f'/api/recipes/{self.recipes[0].id}/',
+                            DETAIL_QUERIES_AUTHENTICATED)
+        self.assertTrue(response.data['is_favorited'])
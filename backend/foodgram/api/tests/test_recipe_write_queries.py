@@ -0,0 +1,149 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, IngredientsInRecipe, Tag
+
+from .utils import clear_caches, create_recipes, create_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+INGREDIENTS_TABLE = '"recipes_ingredient"'
+RECIPE_INGREDIENTS_TABLE = '"recipes_ingredientsinrecipe"'
+
+# Ингредиенты обходятся фиксированным числом запросов при любом их числе:
+# одно чтение всех ингредиентов для проверки и одна вставка при создании,
+# удаление, обновление и вставка при изменении
+CREATE_INGREDIENT_QUERIES = 2
+UPDATE_INGREDIENT_QUERIES = 4
+# Остальное не зависит от ингредиентов:
+# - проверка двух тегов, по запросу на тег (2);
+# - SAVEPOINT и RELEASE вокруг записи (2);
+# - вставка рецепта, счетчик рецептов автора и лента подписчиков (3);
+# - теги рецепта: чтение текущих и вставка (2);
+# - ответ: рецепт, его теги и ингредиенты, id рецептов из избранного
+#   и корзины (5)
+CREATE_QUERIES = CREATE_INGREDIENT_QUERIES + 14
+# При изменении:
+# - рецепт с тегами и ингредиентами для get_object (3);
+# - проверка двух тегов (2), SAVEPOINT и RELEASE (2);
+# - текущие ингредиенты рецепта для сравнения с новыми (1);
+# - теги рецепта: чтение текущих, вставлять нечего (1);
+# - UPDATE рецепта (1) и ответ (5)
+UPDATE_QUERIES = UPDATE_INGREDIENT_QUERIES + 15
+
+
+def image_data():
+    buffer = BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeWriteQueryBudgetTest(APITestCase):
+    """Число запросов при создании и изменении рецепта не зависит от
+    числа ингредиентов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        create_recipes(cls.author, 1, 10)
+        cls.tags = list(Tag.objects.values_list('id', flat=True))
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'extra{number}', measurement_unit='г')
+            for number in range(30)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.author)
+
+    def recipe_data(self, ingredients, name='recipe'):
+        return {
+            'name': name,
+            'text': 'text',
+            'cooking_time': 10,
+            'image': image_data(),
+            'tags': self.tags,
+            'ingredients': [
+                {'id': ingredient_id, 'amount': amount}
+                for ingredient_id, amount in ingredients
+            ],
+        }
+
+    def request(self, method, url, data):
+        """Ответ и запросы к ингредиентам среди всех запросов"""
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        ingredient_queries = [
+            query['sql'] for query in queries.captured_queries
+            if f'FROM {INGREDIENTS_TABLE} ' in query['sql']
+            or query['sql'].startswith((
+                f'INSERT INTO {RECIPE_INGREDIENTS_TABLE}',
+                f'UPDATE {RECIPE_INGREDIENTS_TABLE}',
+                f'DELETE FROM {RECIPE_INGREDIENTS_TABLE}',
+            ))
+        ]
+        return response, len(queries), ingredient_queries
+
+    def test_create(self):
+        for count in (1, 30):
+            with self.subTest(ingredients=count):
+                clear_caches()
+                data = self.recipe_data(
+                    ((ingredient.id, 5)
+                     for ingredient in self.ingredients[:count]),
+                    name=f'recipe with {count} ingredients')
+                response, total, ingredient_queries = self.request(
+                    'post', '/api/recipes/', data)
+                self.assertEqual(response.status_code, 201, response.data)
+                self.assertEqual(len(response.data['ingredients']), count)
+                self.assertEqual(
+                    len(ingredient_queries), CREATE_INGREDIENT_QUERIES,
+                    ingredient_queries)
+                self.assertEqual(total, CREATE_QUERIES)
+
+    def test_update_ingredients(self):
+        # Убрано, изменено и добавлено по одному ингредиенту, затем
+        # два убраны, у трех изменено количество и добавлено 25 —
+        # всего 30 ингредиентов
+        for removed, changed, added in ((1, 1, 1), (2, 3, 25)):
+            with self.subTest(added=added):
+                clear_caches()
+                recipe, = create_recipes(self.author, 1, 10)
+                current = list(IngredientsInRecipe.objects.filter(
+                    recipe=recipe).values_list('ingredient_id', 'amount'))
+                kept = current[removed:]
+                ingredients = (
+                    [(ingredient_id, amount + 1) for ingredient_id, amount
+                     in kept[:changed]]
+                    + kept[changed:]
+                    + [(ingredient.id, 5)
+                       for ingredient in self.ingredients[:added]]
+                )
+                response, total, ingredient_queries = self.request(
+                    'patch', f'/api/recipes/{recipe.id}/',
+                    self.recipe_data(ingredients, name=f'updated {added}'))
+                self.assertEqual(response.status_code, 200, response.data)
+                self.assertCountEqual(
+                    IngredientsInRecipe.objects.filter(
+                        recipe=recipe).values_list('ingredient_id', 'amount'),
+                    ingredients)
+                self.assertEqual(
+                    len(ingredient_queries), UPDATE_INGREDIENT_QUERIES,
+                    ingredient_queries)
+                self.assertEqual(total, UPDATE_QUERIES)
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.checks import check_replica_stickiness
+from foodgram.db.router import PrimaryReplicaRouter, replica_reads
+from recipes.catalog import INGREDIENTS, get_catalog_version
+from recipes.ingredient_index import IngredientIndex
+from recipes.models import Favorite, Recipe
+from recipes.recipe_index import RecipeIngredientIndex
+
+from .utils import clear_caches, create_recipes, create_user
+
+REPLICA = 'replica'
+# Псевдоним нужен до создания тестовых баз, поэтому добавляется при
+# импорте; как зеркало он получает настройки тестовой основной базы
+settings.DATABASES.setdefault(REPLICA, dict(
+    settings.DATABASES[DEFAULT_DB_ALIAS], TEST={'MIRROR': DEFAULT_DB_ALIAS}))
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Чтения идут на реплику, записи и чтения после записи — в основную
+    базу. Реплика здесь — второе соединение с той же тестовой базой"""
+
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    def setUp(self):
+        clear_caches()
+        self.author = create_user('author')
+        self.recipe, = create_recipes(self.author, 1)
+        self.token = Token.objects.create(user=self.author)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def request(self, method, url):
+        """Ответ и таблицы, прочитанные с основной базы и с реплики"""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[REPLICA]) as replica:
+                response = getattr(self.client, method)(url)
+        return response, primary.captured_queries, replica.captured_queries
+
+    def assert_touches(self, queries, table):
+        self.assertTrue(any(table in query['sql'] for query in queries),
+                        f'{table} нет среди запросов')
+
+    def test_reads_go_to_replica(self):
+        response, primary, replica = self.request('get', '/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assert_touches(replica, 'recipes_recipe')
+        # Токены всегда читаются с основной базы
+        self.assert_touches(primary, 'authtoken_token')
+        self.assertFalse(any('authtoken_token' in query['sql']
+                             for query in replica))
+
+    def test_writes_stick_user_to_primary(self):
+        response, primary, replica = self.request(
+            'post', f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assert_touches(primary, 'INSERT INTO "recipes_favorite"')
+        self.assertEqual(replica, [])
+
+        response, primary, replica = self.request('get', '/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][0]['is_favorited'])
+        self.assert_touches(primary, 'recipes_recipe')
+        self.assertEqual(replica, [])
+
+        # Другие пользователи по-прежнему читают с реплики
+        self.client.credentials()
+        _, _, replica = self.request('get', '/api/recipes/')
+        self.assert_touches(replica, 'recipes_recipe')
+
+    def test_stickiness_expires(self):
+        self.request('post', f'/api/recipes/{self.recipe.id}/favorite/')
+        clear_caches()
+        _, _, replica = self.request('get', '/api/recipes/')
+        self.assert_touches(replica, 'recipes_recipe')
+
+    def test_catalog_body_reads_primary(self):
+        _, primary, replica = self.request('get', '/api/tags/')
+        self.assert_touches(primary, 'recipes_tag')
+        self.assertEqual(replica, [])
+
+    def test_process_wide_indexes_read_primary(self):
+        ingredient = self.recipe.ingredients.first()
+        with replica_reads(), CaptureQueriesContext(
+                connections[REPLICA]) as replica:
+            recipe_ids, matches = RecipeIngredientIndex().rank(
+                [ingredient.id])
+            self.assertEqual(recipe_ids.tolist(), [self.recipe.id])
+            self.assertEqual(matches.tolist(), [1])
+            self.assertEqual(IngredientIndex().search(ingredient.name),
+                             [ingredient])
+            get_catalog_version(INGREDIENTS)
+        self.assertEqual(replica.captured_queries, [])
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class PrimaryReplicaRouterTest(TransactionTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_routing(self):
+        self.assertEqual(self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Recipe), REPLICA)
+            self.assertEqual(self.router.db_for_read(Token), DEFAULT_DB_ALIAS)
+            self.assertEqual(
+                self.router.db_for_write(Favorite), DEFAULT_DB_ALIAS)
+            with transaction.atomic():
+                self.assertEqual(
+                    self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+    def test_stickiness_requires_shared_cache(self):
+        self.assertEqual(
+            [error.id for error in check_replica_stickiness(None)],
+            ['api.E001'])
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            self.assertEqual(check_replica_stickiness(None), [])
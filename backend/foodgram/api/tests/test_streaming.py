@@ -0,0 +1,63 @@
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase
+
+from api import shopping_cart
+from api.db import iterate_in_db_pool
+from foodgram.asgi import ASGIHandler
+from recipes.models import Ingredient, IngredientsInRecipe, ShoppingCart
+
+from .utils import create_recipes, create_user
+
+
+class AsyncStreamingTest(SimpleTestCase):
+    """Потоковый ответ в ASGI отдается по частям, а каждая часть
+    вычисляется в пуле потоков БД, а не в цикле событий"""
+
+    def test_chunks_are_produced_in_db_pool(self):
+        threads = []
+
+        def chunks():
+            for number in range(3):
+                threads.append(threading.current_thread().name)
+                yield f'{number}\n'
+
+        response = StreamingHttpResponse(chunks())
+        response.async_streaming_content = iterate_in_db_pool(
+            response.streaming_content)
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(ASGIHandler().send_response)(response, send)
+
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertEqual([message.get('body') for message in messages[1:]],
+                         [b'0\n', b'1\n', b'2\n', None])
+        self.assertTrue(all(name.startswith('db') for name in threads))
+
+
+class ShoppingCartRowsTest(TestCase):
+
+    def test_rows_are_read_page_by_page(self):
+        user = create_user('user')
+        recipes = create_recipes(user, 2)
+        kilograms = Ingredient.objects.create(
+            name='ingredient0', measurement_unit='кг')
+        IngredientsInRecipe.objects.create(
+            recipe=recipes[0], ingredient=kilograms, amount=1)
+        for recipe in recipes:
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+
+        with mock.patch.object(shopping_cart, 'CHUNK_SIZE', 2):
+            with self.assertNumQueries(3):
+                rows = list(shopping_cart.shopping_cart_rows(user))
+        self.assertEqual(
+            [(row['ingredient__name'], row['ingredient__measurement_unit'],
+              row['amount']) for row in rows],
+            [('ingredient0', 'г', 20), ('ingredient0', 'кг', 1),
+             ('ingredient1', 'г', 20), ('ingredient2', 'г', 20)])
@@ -0,0 +1,47 @@
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.checks import check_token_cache
+from users.token_cache import token_cache
+
+from .utils import clear_caches, create_user
+
+
+class TokenCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        clear_caches()
+        token_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_me(self):
+        return self.client.get('/api/users/me/')
+
+    def test_disabled_with_process_local_cache(self):
+        self.assertEqual(self.get_me().status_code, 200)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    @override_settings(AUTH_TOKEN_CACHE_SHARED=True)
+    def test_revoked_token_is_rejected(self):
+        self.assertEqual(self.get_me().status_code, 200)
+        self.assertEqual(token_cache.get(self.token.key), self.user)
+        # Другой процесс видит ту же запись общего кэша
+        token_cache.clear()
+        self.assertEqual(token_cache.get(self.token.key), self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.get(key=self.token.key).delete()
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(self.get_me().status_code, 401)
+
+    @override_settings(AUTH_TOKEN_CACHE_SHARED=True)
+    def test_shared_cache_is_required(self):
+        self.assertEqual(
+            [error.id for error in check_token_cache(None)], ['api.E002'])
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+
+from recipes.models import Ingredient, IngredientsInRecipe, Recipe, Tag
+from users.models import User
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username, email=f'{username}@foodgram.ru',
+        password='password', first_name=username, last_name=username)
+
+
+def create_recipes(author, count, ingredients_per_recipe=3):
+    """Рецепты с тегами и ингредиентами для проверок числа запросов"""
+    tags = [
+        Tag.objects.get_or_create(
+            slug=f'tag{number}',
+            defaults={'name': f'tag{number}', 'color': f'#00000{number}'})[0]
+        for number in range(2)
+    ]
+    ingredients = [
+        Ingredient.objects.get_or_create(
+            name=f'ingredient{number}', measurement_unit='г')[0]
+        for number in range(ingredients_per_recipe)
+    ]
+    recipes = []
+    for _ in range(count):
+        recipe = Recipe.objects.create(
+            name=f'recipe {Recipe.objects.count()}', author=author,
+            text='text', cooking_time=5, image='recipes/image.jpg')
+        recipe.tags.set(tags)
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(recipe=recipe, ingredient=ingredient,
+                                amount=10)
+            for ingredient in ingredients
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+def clear_caches():
+    cache.clear()
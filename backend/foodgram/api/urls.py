@@ -1,6 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .mixins import asgi_view
+
 from .views import (IngredientViewSet, RecipeViewSet, SelfUserView,
                     SetPasswordRetypeView, TagViewSet, UserViewSet,
                     get_token)
@@ -16,6 +18,6 @@ urlpatterns = [
     path('users/me/', SelfUserView.as_view()),
     path('users/set_password/', SetPasswordRetypeView.as_view()),
     path('', include(router.urls)),
-    path('auth/token/login/', get_token),
+    path('auth/token/login/', asgi_view(get_token)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
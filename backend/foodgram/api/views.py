@@ -1,22 +1,39 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch,
+                              Value, prefetch_related_objects)
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as rf_filters
 
 from rest_framework import mixins, permissions, status, views, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
 from .filters import IngredientFilter, RecipeFilter
+from .pagination import KeysetPagination
+from .mixins import (AsyncViewMixin, CatalogConditionalGetMixin,
+                     StickyWritesMixin)
+from .parsers import BoundedJSONParser
+from .renderers import CSVRenderer, TextRenderer
 from .serializers import (CustomSetPasswordRetypeSerializer,
                           CustomUserCreateSerializer, CustomUserSerializer,
                           IngredientSerializer, RecipeCreateSerializer,
-                          RecipeSubscriptionSerializer, RecipeReadSerializer,
+                          RecipeMatchSerializer, RecipeReadSerializer,
+                          RecipeSubscriptionSerializer,
                           SubscriptionSerializer, TagSerializer,
-                          GetTokenSerializer)
+                          GetTokenSerializer, get_recipes_limit)
+from .shopping_cart import EXPORTERS, shopping_cart_rows
 from users.models import User, Subscription
-from recipes.models import (Favorite, Ingredient, Recipe, IngredientsInRecipe,
+from recipes import catalog
+from recipes.ingredient_index import ingredient_index
+from recipes.feed import is_materialized
+from recipes.models import (FeedEntry, Favorite, Ingredient, Recipe,
                             ShoppingCart, Tag)
+from recipes.recipe_index import RankedRecipes, recipe_index
+
+MAX_MATCH_INGREDIENTS = 50
 
 
 @api_view(['POST'])
@@ -30,13 +47,23 @@ def get_token(request):
 
 
 class UserViewSet(
-    mixins.CreateModelMixin, mixins.ListModelMixin,
+    AsyncViewMixin, StickyWritesMixin, mixins.CreateModelMixin, mixins.ListModelMixin,
     mixins.RetrieveModelMixin, viewsets.GenericViewSet
 ):
     """Вьюсет для регистрации и отображения пользователей"""
 
     queryset = User.objects.all()
     permission_classes = [permissions.AllowAny]
+    cursor_ordering = ('username', 'id')
+    sticky_actions = ('subscribe',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef('pk'))))
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -45,8 +72,18 @@ class UserViewSet(
 
     @action(detail=False, permission_classes=[permissions.IsAuthenticated])
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
+        queryset = User.objects.filter(
+            following__user=request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        )
         page = self.paginate_queryset(queryset)
+        prefetch_related_objects(page, Prefetch(
+            'recipes',
+            queryset=Recipe.objects.latest_per_author(
+                page, get_recipes_limit(request)),
+            to_attr='latest_recipes'
+        ))
         serializer = SubscriptionSerializer(
             page,
             many=True,
@@ -83,7 +120,7 @@ class UserViewSet(
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class SelfUserView(views.APIView):
+class SelfUserView(AsyncViewMixin, views.APIView):
     """Вьюкласс текущего пользователя"""
 
     permission_classes = [permissions.IsAuthenticated]
@@ -100,7 +137,7 @@ class SelfUserView(views.APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class SetPasswordRetypeView(views.APIView):
+class SetPasswordRetypeView(AsyncViewMixin, views.APIView):
     """Вьюкласс изменения пароля пользователя"""
 
     permission_classes = [permissions.IsAuthenticated]
@@ -120,35 +157,56 @@ class SetPasswordRetypeView(views.APIView):
         return Response(status=status.HTTP_201_CREATED)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(AsyncViewMixin, CatalogConditionalGetMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Вьюсет тегов"""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    authentication_classes = []
     permission_classes = [permissions.AllowAny]
     pagination_class = None
+    catalog = catalog.TAGS
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(AsyncViewMixin, CatalogConditionalGetMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """Вьюсет ингредиентов"""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    authentication_classes = []
     permission_classes = [permissions.AllowAny]
     pagination_class = None
     filter_backends = [rf_filters.DjangoFilterBackend]
     filterset_class = IngredientFilter
+    catalog = catalog.INGREDIENTS
+
+    def filter_queryset(self, queryset):
+        if self.action != 'list':
+            return super().filter_queryset(queryset)
+        name = self.request.query_params.get('name')
+        if name is None:
+            return ingredient_index.all(self.catalog_version)
+        return ingredient_index.search(name, self.catalog_version)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AsyncViewMixin, StickyWritesMixin,
+                    viewsets.ModelViewSet):
     """Вьюсет рецептов"""
 
     http_method_names = ['get', 'post', 'patch', 'delete']
     queryset = Recipe.objects.all()
+    parser_classes = [BoundedJSONParser, FormParser, MultiPartParser]
     permission_classes = [
         permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [rf_filters.DjangoFilterBackend]
     filterset_class = RecipeFilter
+    sticky_actions = ('create', 'partial_update', 'destroy', 'favorite',
+                      'shopping_cart', 'shopping_cart_delete')
+
+    def get_queryset(self):
+        return Recipe.objects.for_read(self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -159,6 +217,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action in ['create', 'partial_update']:
             return RecipeCreateSerializer
+        if self.action == 'what_to_cook':
+            return RecipeMatchSerializer
         return RecipeReadSerializer
 
     @action(
@@ -179,7 +239,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     {'errors': 'Рецепт уже добавлен в избранное'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            recipe = Favorite.objects.create(user=user, recipe=recipe)
+            Favorite.objects.create(user=user, recipe=recipe)
             serializer = RecipeSubscriptionSerializer(
                 instance=recipe,
                 context={'request': request}
@@ -219,24 +279,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         methods=['GET'],
         detail=False,
-        permission_classes=[permissions.IsAuthenticated]
+        permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=[TextRenderer, CSVRenderer, JSONRenderer]
     )
     def download_shopping_cart(self, request, **kwargs):
-        user = self.request.user
-        ingredients_for_user = IngredientsInRecipe.objects.filter(
-            recipe__shopping__user=user)
-        ingredients_shopcart = ingredients_for_user.values(
-            'ingredient__name', 'ingredient__measurement_unit')
-        sum_ingredients = ingredients_shopcart.annotate(
-            amount=Sum('amount'))
-        shopping_cart = []
-        for i in sum_ingredients:
-            shopping_cart += (
-                f'{i["ingredient__name"]}: '
-                f'{i["amount"]} {i["ingredient__measurement_unit"]} ')
-        response = HttpResponse(shopping_cart, content_type='text/plain')
-        response['Content-Disposition'] = 'attachment; filename="shopcart.txt"'
-
+        export_format = request.accepted_renderer.format
+        exporter, content_type = EXPORTERS[export_format]
+        response = StreamingHttpResponse(
+            exporter(shopping_cart_rows(request.user)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopcart.{export_format}"')
         return response
 
     @shopping_cart.mapping.delete
@@ -249,3 +303,56 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if count == 0:
             return Response(status=status.HTTP_400_BAD_REQUEST)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, permission_classes=[permissions.IsAuthenticated])
+    def feed(self, request):
+        user = request.user
+        paginator = KeysetPagination()
+        subscriptions_count = User.objects.values_list(
+            'subscriptions_count', flat=True).get(pk=user.pk)
+        if is_materialized(subscriptions_count):
+            paginator.ordering = ('-pub_date', '-recipe_id')
+            entries = paginator.paginate_queryset(
+                FeedEntry.objects.filter(user=user).only(
+                    'recipe_id', 'pub_date'),
+                request
+            )
+            recipes = self.get_queryset().in_bulk(
+                [entry.recipe_id for entry in entries])
+            page = [
+                recipes[entry.recipe_id] for entry in entries
+                if entry.recipe_id in recipes
+            ]
+        else:
+            page = paginator.paginate_queryset(
+                self.get_queryset().filter(
+                    author__in=Subscription.objects.filter(
+                        user=user).values('author')
+                ),
+                request
+            )
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    def what_to_cook(self, request):
+        ingredient_ids = {
+            value.strip()
+            for values in request.query_params.getlist('ingredients')
+            for value in values.split(',') if value.strip()
+        }
+        if not ingredient_ids or not all(
+                value.isdigit() for value in ingredient_ids):
+            raise ValidationError(
+                {'ingredients': 'Укажите id ингредиентов через запятую'})
+        if len(ingredient_ids) > MAX_MATCH_INGREDIENTS:
+            raise ValidationError({'ingredients': (
+                f'Можно указать не более {MAX_MATCH_INGREDIENTS} '
+                f'ингредиентов')})
+        recipes = RankedRecipes(
+            self.get_queryset(),
+            recipe_index.rank(int(value) for value in ingredient_ids)
+        )
+        page = self.paginate_queryset(recipes)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
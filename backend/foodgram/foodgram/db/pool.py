@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from collections import Counter, deque
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+_pools = {}
+_pools_lock = threading.Lock()
+_events = Counter()
+_events_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Свободное соединение не появилось за время ожидания"""
+
+
+def record(event):
+    with _events_lock:
+        _events[event] += 1
+
+
+def stats():
+    """Состояние пулов и счетчики событий соединений в текущем процессе"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    with _events_lock:
+        result = {event: _events[event]
+                  for event in ('connects', 'reconnects', 'waits', 'timeouts')}
+    result['in_use'] = sum(pool.in_use for pool in pools)
+    result['idle'] = sum(pool.idle for pool in pools)
+    return result
+
+
+def is_alive(connection, ping):
+    if connection.closed:
+        return False
+    if not ping:
+        return True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except psycopg2.Error:
+        return False
+    return True
+
+
+class ConnectionPool:
+    """Пул соединений psycopg2 в памяти процесса.
+
+    Открытых соединений не больше size; если все заняты, acquire ждет
+    освобождения не дольше timeout секунд и затем выбрасывает PoolTimeout.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self.in_use = 0
+        self._idle = deque()
+        self._condition = threading.Condition()
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def acquire(self, connect, ping=False):
+        """Свободное соединение из пула или новое, созданное connect()"""
+        with self._condition:
+            deadline = None
+            while not self._idle and self.in_use >= self.size:
+                if deadline is None:
+                    record('waits')
+                    deadline = time.monotonic() + self.timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    record('timeouts')
+                    raise PoolTimeout(
+                        f'Все {self.size} соединений пула заняты дольше '
+                        f'{self.timeout} с')
+                self._condition.wait(remaining)
+            self.in_use += 1
+            connection = self._idle.pop() if self._idle else None
+        try:
+            if connection is not None and not is_alive(connection, ping):
+                record('reconnects')
+                self.discard(connection)
+                connection = None
+            if connection is None:
+                connection = connect()
+                record('connects')
+        except BaseException:
+            self.checkin(None)
+            raise
+        return connection
+
+    def release(self, connection):
+        """Возвращает соединение в пул, откатив незавершенную транзакцию"""
+        try:
+            if (not connection.closed and connection.get_transaction_status()
+                    != TRANSACTION_STATUS_IDLE):
+                connection.rollback()
+            reusable = (not connection.closed
+                        and connection.get_transaction_status()
+                        == TRANSACTION_STATUS_IDLE)
+        except psycopg2.Error:
+            reusable = False
+        if not reusable:
+            self.discard(connection)
+        self.checkin(connection if reusable else None)
+
+    def checkin(self, connection):
+        with self._condition:
+            self.in_use -= 1
+            if connection is not None:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    @staticmethod
+    def discard(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+
+def get_pool(key, size, timeout):
+    """Пул для параметров подключения key; после fork создается заново"""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(size, timeout)
+        return pool
@@ -0,0 +1,73 @@
+from functools import partial
+
+from django.db.backends.postgresql import base
+
+from ..pool import get_pool, is_alive, record
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой постоянных соединений и пулом на процесс.
+
+    CONN_HEALTH_CHECKS повторяет поведение Django 4.1: переиспользуемое
+    соединение проверяется перед первым запросом в каждом HTTP-запросе
+    и при обрыве открывается заново. POOL = {'SIZE': n, 'TIMEOUT': s}
+    с SIZE больше нуля включает общий для потоков процесса пул, куда
+    соединения возвращаются вместо закрытия.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool = None
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict.get('POOL') or {}
+        if not options.get('SIZE'):
+            return None
+        key = tuple(sorted(
+            (name, repr(value)) for name, value in conn_params.items()))
+        return get_pool(key, options['SIZE'], options.get('TIMEOUT', 10))
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        if self.pool is None:
+            record('connects')
+            return super().get_new_connection(conn_params)
+        connection = self.pool.acquire(
+            partial(super().get_new_connection, conn_params),
+            ping=self.health_check_enabled)
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        pool, self.pool = self.pool, None
+        with self.wrap_database_errors:
+            return pool.release(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None or not self.health_check_enabled
+                or self.health_check_done or self.in_atomic_block):
+            return
+        if not is_alive(self.connection, ping=True):
+            record('reconnects')
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
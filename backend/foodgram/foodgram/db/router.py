@@ -0,0 +1,48 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Токены читаются с основной базы: только что выданный при входе токен
+# может еще не дойти до реплики
+PRIMARY_ONLY_MODELS = {'authtoken.token'}
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Разрешает читать с реплик в текущем контексте, в том числе в
+    потоках пула БД, куда контекст копируется"""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Записи идут в основную базу, чтения — на случайную реплику, если
+    это разрешено контекстом запроса.
+
+    Вне HTTP-запросов (команды, миграции) и внутри транзакций все
+    запросы идут в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (not settings.DATABASE_REPLICAS or not _replica_reads.get()
+                or model._meta.label_lower in PRIMARY_ONLY_MODELS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
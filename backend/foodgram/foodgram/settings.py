@@ -32,6 +32,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
+    'api.metrics.MetricsMiddleware',
+    'api.querywatch.QueryWatchMiddleware',
+    'api.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,12 +74,43 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
+        'ENGINE': os.getenv('DB_ENGINE', default='foodgram.db.postgresql'),
         'NAME': os.getenv('DB_NAME', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', default='true').lower() == 'true',
+        'POOL': {
+            'SIZE': int(os.getenv('DB_POOL_SIZE', default=0)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+        },
+    }
+}
+
+# Реплики только для чтения: DB_REPLICA_HOSTS=replica1,replica2:5433
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')), start=1):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['foodgram.db.router.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', default=5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
     }
 }
 
@@ -94,6 +129,14 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'users.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', default=260000))
+
 LANGUAGE_CODE = 'ru'
 
 TIME_ZONE = 'UTC'
@@ -109,6 +152,76 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', default=2))
+RECIPE_UPLOAD_MAX_SIZE = int(os.getenv('RECIPE_UPLOAD_MAX_SIZE', default=10 * 1024 * 1024))
+RECIPE_IMAGE_MAX_PIXELS = int(os.getenv('RECIPE_IMAGE_MAX_PIXELS', default=25_000_000))
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', default='true').lower() == 'true'
+PROFILING_LOG_SAMPLE_RATE = float(os.getenv('PROFILING_LOG_SAMPLE_RATE', default=0))
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='true').lower() == 'true'
+METRICS_WORKER_THREADS = int(os.getenv('METRICS_WORKER_THREADS', default=1))
+
+SERVER_MODE = os.getenv('SERVER_MODE', default='wsgi')
+ASYNC_VIEWS = SERVER_MODE == 'asgi'
+ASGI_DB_THREADS = int(os.getenv('ASGI_DB_THREADS', default=8))
+
+QUERY_WATCH_ENABLED = os.getenv('QUERY_WATCH_ENABLED', default='true').lower() == 'true'
+QUERY_WATCH_RAISE = os.getenv('QUERY_WATCH_RAISE', default='false').lower() == 'true'
+QUERY_WATCH_REPEAT_THRESHOLD = int(os.getenv('QUERY_WATCH_REPEAT_THRESHOLD', default=5))
+QUERY_WATCH_SAMPLE_RATE = float(os.getenv('QUERY_WATCH_SAMPLE_RATE', default=0.01))
+
+# В тестах повтор запроса (N+1) — ошибка, см. foodgram.test_runner
+TEST_RUNNER = 'foodgram.test_runner.TestRunner'
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', default=100))
+SLOW_QUERY_TOP_N = int(os.getenv('SLOW_QUERY_TOP_N', default=20))
+SLOW_QUERY_REPORT_INTERVAL = int(os.getenv('SLOW_QUERY_REPORT_INTERVAL', default=300))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'api.querywatch': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+FEED_MATERIALIZE_THRESHOLD = int(os.getenv('FEED_MATERIALIZE_THRESHOLD', default=100))
+
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', default=60))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', default=10000))
+# Отзыв токена виден всем процессам только через общий кэш, поэтому с кэшем
+# в памяти процесса кэширование токенов по умолчанию выключено
+AUTH_TOKEN_CACHE_SHARED = os.getenv(
+    'AUTH_TOKEN_CACHE_SHARED',
+    default=str(CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache')
+).lower() == 'true'
+# LRU в памяти процесса: быстрее, но отозванный токен остается действительным
+# в других процессах до AUTH_TOKEN_CACHE_TTL секунд
+AUTH_TOKEN_CACHE_LOCAL = os.getenv('AUTH_TOKEN_CACHE_LOCAL', default='false').lower() == 'true'
+
+# Сброс кэша избранного и корзины виден всем процессам только через общий
+# кэш, поэтому с кэшем в памяти процесса он по умолчанию выключен
+MEMBERSHIP_CACHE_ENABLED = os.getenv(
+    'MEMBERSHIP_CACHE_ENABLED',
+    default=str(CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache')
+).lower() == 'true'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -120,7 +233,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPagination',
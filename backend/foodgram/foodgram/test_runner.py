@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Запускает тесты с QUERY_WATCH_RAISE, поэтому N+1 в любом
+    HTTP-запросе теста вызывает NPlusOneError"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_WATCH_ENABLED = True
+        settings.QUERY_WATCH_RAISE = True
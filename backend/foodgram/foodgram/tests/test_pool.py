@@ -0,0 +1,169 @@
+import threading
+from unittest import mock
+
+import psycopg2
+from django.db import OperationalError
+from django.test import SimpleTestCase
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_INTRANS)
+
+from foodgram.db import pool
+from foodgram.db.pool import ConnectionPool, PoolTimeout
+from foodgram.db.postgresql.base import DatabaseWrapper
+
+
+class StubCursor:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql, params=None):
+        if self.connection.broken:
+            raise psycopg2.OperationalError('server closed the connection')
+        self.connection.queries.append(sql)
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    """Соединение psycopg2 без сервера"""
+
+    def __init__(self, **params):
+        self.closed = 0
+        self.broken = False
+        self.queries = []
+        self.status = TRANSACTION_STATUS_IDLE
+        self.isolation_level = None
+        self.autocommit = False
+
+    def cursor(self, *args, **kwargs):
+        return StubCursor(self)
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def get_parameter_status(self, name):
+        return 'UTC'
+
+    def set_session(self, **kwargs):
+        pass
+
+    def set_client_encoding(self, encoding):
+        pass
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool(size=2, timeout=0.05)
+
+    def test_release_returns_connection_for_reuse(self):
+        connection = self.pool.acquire(StubConnection)
+        self.assertEqual((self.pool.in_use, self.pool.idle), (1, 0))
+        self.pool.release(connection)
+        self.assertEqual((self.pool.in_use, self.pool.idle), (0, 1))
+        self.assertIs(self.pool.acquire(StubConnection), connection)
+
+    def test_release_rolls_back_open_transaction(self):
+        connection = self.pool.acquire(StubConnection)
+        connection.status = TRANSACTION_STATUS_INTRANS
+        self.pool.release(connection)
+        self.assertEqual(connection.status, TRANSACTION_STATUS_IDLE)
+        self.assertIs(self.pool.acquire(StubConnection), connection)
+
+    def test_closed_connection_is_not_returned(self):
+        connection = self.pool.acquire(StubConnection)
+        connection.close()
+        self.pool.release(connection)
+        self.assertEqual((self.pool.in_use, self.pool.idle), (0, 0))
+
+    def test_broken_idle_connection_is_replaced(self):
+        broken = self.pool.acquire(StubConnection)
+        self.pool.release(broken)
+        broken.broken = True
+        connection = self.pool.acquire(StubConnection, ping=True)
+        self.assertIsNot(connection, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(self.pool.in_use, 1)
+
+    def test_failed_connect_frees_slot(self):
+        def connect():
+            raise psycopg2.OperationalError('could not connect')
+
+        with self.assertRaises(psycopg2.OperationalError):
+            self.pool.acquire(connect)
+        self.assertEqual(self.pool.in_use, 0)
+
+    def test_exhausted_pool_times_out(self):
+        for _ in range(self.pool.size):
+            self.pool.acquire(StubConnection)
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire(StubConnection)
+        self.assertEqual(self.pool.in_use, self.pool.size)
+
+    def test_waiter_gets_released_connection(self):
+        self.pool.timeout = 5
+        held = [self.pool.acquire(StubConnection)
+                for _ in range(self.pool.size)]
+        timer = threading.Timer(0.05, self.pool.release, [held[0]])
+        timer.start()
+        self.assertIs(self.pool.acquire(StubConnection), held[0])
+        timer.join()
+
+
+@mock.patch('psycopg2.extras.register_default_jsonb', mock.Mock())
+@mock.patch('django.db.backends.postgresql.base.Database.connect',
+            StubConnection)
+class DatabaseWrapperTest(SimpleTestCase):
+
+    def make_wrapper(self, **settings):
+        settings_dict = {
+            'ENGINE': 'foodgram.db.postgresql', 'NAME': 'foodgram',
+            'USER': '', 'PASSWORD': '', 'HOST': 'stub', 'PORT': '',
+            'OPTIONS': {}, 'TIME_ZONE': None, 'AUTOCOMMIT': True,
+            'ATOMIC_REQUESTS': False, 'CONN_MAX_AGE': 0,
+        }
+        settings_dict.update(settings)
+        return DatabaseWrapper(settings_dict, alias='stub')
+
+    def test_close_returns_connection_to_pool(self):
+        wrapper = self.make_wrapper(
+            NAME='pooled', POOL={'SIZE': 1, 'TIMEOUT': 0.05})
+        wrapper.ensure_connection()
+        connection = wrapper.connection
+        wrapper.close()
+        self.assertFalse(connection.closed)
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, connection)
+        # Соединение занято этой оберткой, вторая ждет и получает ошибку
+        with self.assertRaises(OperationalError):
+            self.make_wrapper(
+                NAME='pooled', POOL={'SIZE': 1, 'TIMEOUT': 0.05}
+            ).ensure_connection()
+        wrapper.close()
+
+    def test_health_check_replaces_broken_connection(self):
+        wrapper = self.make_wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        broken = wrapper.connection
+        reconnects = pool.stats()['reconnects']
+        wrapper.close_if_unusable_or_obsolete()
+        broken.broken = True
+        with wrapper.cursor():
+            pass
+        self.assertIsNot(wrapper.connection, broken)
+        self.assertEqual(pool.stats()['reconnects'], reconnects + 1)
+        wrapper.close()
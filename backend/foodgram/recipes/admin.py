@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import connections
 from .models import (Favorite, Ingredient, Recipe, IngredientsInRecipe,
                      ShoppingCart, Tag)
 
@@ -23,15 +24,21 @@ class RecipeAdmin(admin.ModelAdmin):
         'total_favorites',
         'pub_date'
     ]
-    search_fields = ['name', 'author', 'text', 'cooking_time']
+    search_fields = ['name', 'author__username', 'text', 'cooking_time']
     readonly_fields = ['total_favorites']
     list_filter = ['name', 'author', 'pub_date', 'tags']
     empty_value_display = 'пусто'
     inlines = (RecipeIngredientInline, )
 
-    @admin.display(description='Всего в избранном')
+    def get_search_results(self, request, queryset, search_term):
+        if search_term and connections[queryset.db].vendor == 'postgresql':
+            return queryset.search(search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.display(description='Всего в избранном',
+                   ordering='favorites_count')
     def total_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(Tag)
@@ -0,0 +1,34 @@
+import uuid
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .models import CatalogVersion
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+
+
+def _new_version():
+    return {'token': uuid.uuid4().hex, 'modified': timezone.now()}
+
+
+def get_catalog_version(catalog):
+    """Версия справочника: токен и время последнего изменения.
+
+    Версия хранится в основной базе, поэтому ее изменение сразу видят
+    все процессы, а реплика с отставанием не вернет старую версию.
+    """
+    versions = CatalogVersion.objects.using(DEFAULT_DB_ALIAS)
+    version = versions.filter(catalog=catalog).values_list(
+        'token', 'modified').first()
+    if version is None:
+        created, _ = versions.get_or_create(
+            catalog=catalog, defaults=_new_version())
+        version = created.token, created.modified
+    return version
+
+
+def bump_catalog_version(catalog):
+    CatalogVersion.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        catalog=catalog, defaults=_new_version())
@@ -0,0 +1,35 @@
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счетчик, не опуская его ниже нуля"""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def count_subquery(related_model, related_field):
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile_counter(model, field, related_model, related_field,
+                      batch_size=10000):
+    """Пересчитывает счетчик пакетами по id, возвращает число исправлений"""
+    actual = count_subquery(related_model, related_field)
+    last_id = model.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+    fixed = 0
+    for start in range(0, last_id + 1, batch_size):
+        fixed += model.objects.filter(
+            pk__gte=start, pk__lt=start + batch_size
+        ).annotate(
+            actual=actual
+        ).exclude(
+            **{field: F('actual')}
+        ).update(**{field: actual})
+    return fixed
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.db import connection
+
+from users.models import Subscription, User
+
+from .models import FeedEntry, Recipe
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _insert(select_sql, params):
+    """INSERT ... SELECT в ленту без дубликатов"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {_table(FeedEntry)} '
+            f'(user_id, recipe_id, author_id, pub_date) {select_sql} '
+            f'ON CONFLICT (user_id, recipe_id) DO NOTHING',
+            params
+        )
+
+
+def is_materialized(subscriptions_count):
+    return subscriptions_count >= settings.FEED_MATERIALIZE_THRESHOLD
+
+
+def materialize(user_id):
+    """Заполняет ленту пользователя рецептами всех его подписок"""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    _insert(
+        f'SELECT %s, recipe.id, recipe.author_id, recipe.pub_date '
+        f'FROM {_table(Recipe)} recipe '
+        f'INNER JOIN {_table(Subscription)} subscription '
+        f'ON subscription.author_id = recipe.author_id '
+        f'WHERE subscription.user_id = %s',
+        [user_id, user_id]
+    )
+
+
+def clear(user_id):
+    FeedEntry.objects.filter(user_id=user_id).delete()
+
+
+def add_author(user_id, author_id):
+    _insert(
+        f'SELECT %s, recipe.id, recipe.author_id, recipe.pub_date '
+        f'FROM {_table(Recipe)} recipe WHERE recipe.author_id = %s',
+        [user_id, author_id]
+    )
+
+
+def remove_author(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def publish(recipe_id):
+    """Добавляет рецепт в материализованные ленты подписчиков автора"""
+    _insert(
+        f'SELECT subscription.user_id, recipe.id, recipe.author_id, '
+        f'recipe.pub_date '
+        f'FROM {_table(Recipe)} recipe '
+        f'INNER JOIN {_table(Subscription)} subscription '
+        f'ON subscription.author_id = recipe.author_id '
+        f'INNER JOIN {_table(User)} follower '
+        f'ON follower.id = subscription.user_id '
+        f'WHERE recipe.id = %s AND follower.subscriptions_count >= %s',
+        [recipe_id, settings.FEED_MATERIALIZE_THRESHOLD]
+    )
+
+
+def _subscriptions_count(user_id):
+    """Число подписок по самой таблице подписок, а не по счетчику
+    пользователя: порядок обработчиков сигналов разных приложений не
+    гарантирует, что счетчик уже обновлен"""
+    return Subscription.objects.filter(user_id=user_id).count()
+
+
+def subscribed(user_id, author_id):
+    subscriptions_count = _subscriptions_count(user_id)
+    if subscriptions_count == settings.FEED_MATERIALIZE_THRESHOLD:
+        materialize(user_id)
+    elif is_materialized(subscriptions_count):
+        add_author(user_id, author_id)
+
+
+def unsubscribed(user_id, author_id):
+    subscriptions_count = _subscriptions_count(user_id)
+    if is_materialized(subscriptions_count):
+        remove_author(user_id, author_id)
+    elif subscriptions_count == settings.FEED_MATERIALIZE_THRESHOLD - 1:
+        clear(user_id)
@@ -0,0 +1,87 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL = 'thumbnail'
+DETAIL = 'detail'
+WEBP = 'webp'
+
+RENDITIONS = {
+    THUMBNAIL: ((480, 480), 'JPEG', 'jpg'),
+    DETAIL: ((1280, 1280), 'JPEG', 'jpg'),
+    WEBP: ((1280, 1280), 'WEBP', 'webp'),
+}
+RENDITIONS_DIR = 'recipes/renditions'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                    thread_name_prefix='renditions'
+                )
+    return _executor
+
+
+def render(image, size, image_format):
+    rendition = image.copy()
+    rendition.thumbnail(size)
+    if image_format == 'JPEG' and rendition.mode not in ('RGB', 'L'):
+        rendition = rendition.convert('RGB')
+    buffer = BytesIO()
+    rendition.save(buffer, image_format, quality=85)
+    return buffer.getvalue()
+
+
+def build_renditions(recipe_id, image_name):
+    """Создает уменьшенные копии изображения и сохраняет их пути в рецепте"""
+    try:
+        with default_storage.open(image_name) as file:
+            image = Image.open(file)
+            image.load()
+        stem = os.path.splitext(os.path.basename(image_name))[0]
+        renditions = {}
+        for name, (size, image_format, extension) in RENDITIONS.items():
+            renditions[name] = default_storage.save(
+                f'{RENDITIONS_DIR}/{stem}_{name}.{extension}',
+                ContentFile(render(image, size, image_format)))
+        Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+            image_renditions=renditions)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', image_name)
+
+
+def run_in_worker(task):
+    try:
+        task()
+    finally:
+        connections.close_all()
+
+
+def schedule_renditions(recipe):
+    """Ставит обработку изображения в очередь после фиксации транзакции"""
+    task = partial(build_renditions, recipe.pk, recipe.image.name)
+    if settings.IMAGE_PROCESSING_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(run_in_worker, task))
+    else:
+        transaction.on_commit(task)
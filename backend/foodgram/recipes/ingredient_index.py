@@ -0,0 +1,74 @@
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from django.db import DEFAULT_DB_ALIAS
+
+from .catalog import INGREDIENTS, get_catalog_version
+from .models import Ingredient
+
+
+def normalize(value):
+    """Ключ поиска: NFKC, без учета регистра, ё приравнена к е"""
+    return unicodedata.normalize('NFKC', value).casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Загружается с основной базы, как и версия справочника, с которой
+    он сверяется. Вызывающий код может передать уже полученную версию,
+    чтобы не запрашивать ее повторно.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self, version=None):
+        if version is None:
+            version = get_catalog_version(INGREDIENTS)
+        entries = self._entries
+        if entries is not None and entries[0] == version:
+            return entries[1:]
+        with self._lock:
+            if self._entries is None or self._entries[0] != version:
+                rows = sorted(
+                    (normalize(name), pk, name, measurement_unit)
+                    for pk, name, measurement_unit
+                    in Ingredient.objects.using(DEFAULT_DB_ALIAS).values_list(
+                        'id', 'name', 'measurement_unit')
+                )
+                self._entries = (
+                    version,
+                    [key for key, *_ in rows],
+                    [
+                        Ingredient(id=pk, name=name,
+                                   measurement_unit=measurement_unit)
+                        for _, pk, name, measurement_unit in rows
+                    ],
+                )
+            return self._entries[1:]
+
+    def all(self, version=None):
+        return list(self._load(version)[1])
+
+    def search(self, name, version=None):
+        """Сначала совпадения по началу названия, затем по вхождению"""
+        keys, ingredients = self._load(version)
+        query = normalize(name)
+        if not query:
+            return list(ingredients)
+        start = end = bisect_left(keys, query)
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        contains = [
+            ingredient
+            for position, (key, ingredient) in enumerate(
+                zip(keys, ingredients))
+            if (position < start or position >= end) and query in key
+        ]
+        return ingredients[start:end] + contains
+
+
+ingredient_index = IngredientIndex()
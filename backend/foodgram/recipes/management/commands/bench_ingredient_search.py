@@ -0,0 +1,47 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.catalog import INGREDIENTS, get_catalog_version
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает поиск ингредиентов через ORM и индекс в памяти'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            self.stderr.write('Каталог ингредиентов пуст')
+            return
+        rng = random.Random(options['seed'])
+        prefixes = [
+            name[:rng.randint(1, 4)]
+            for name in rng.choices(names, k=options['queries'])
+        ]
+        # Версию справочника вьюха получает один раз для ETag и передает
+        # в индекс, поэтому поиск в индексе обходится без запросов
+        version = get_catalog_version(INGREDIENTS)
+        ingredient_index.search('', version)
+
+        started = time.perf_counter()
+        for prefix in prefixes:
+            list(Ingredient.objects.filter(name__startswith=prefix))
+        orm_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for prefix in prefixes:
+            ingredient_index.search(prefix, version)
+        index_time = time.perf_counter() - started
+
+        for label, elapsed in (('ORM', orm_time), ('index', index_time)):
+            self.stdout.write(
+                f'{label}: {elapsed / len(prefixes) * 1e6:.1f} мкс/запрос'
+            )
+        self.stdout.write(f'Ускорение: {orm_time / index_time:.1f}x')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать копии и для уже обработанных рецептов'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_renditions={})
+        processed = 0
+        for recipe_id, image_name in recipes.values_list(
+                'id', 'image').iterator():
+            build_renditions(recipe_id, image_name)
+            processed += 1
+        self.stdout.write(f'Обработано изображений: {processed}')
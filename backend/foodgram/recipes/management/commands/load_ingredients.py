@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.catalog import INGREDIENTS, bump_catalog_version
+from recipes.models import Ingredient
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            if len(row) >= 2:
+                yield row[0].strip(), row[1].strip()
+
+
+def read_json(path):
+    """Потоково читает массив объектов JSON, не загружая файл целиком"""
+    decoder = json.JSONDecoder()
+    buffer, position = '', 0
+    with open(path, encoding='utf-8') as file:
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n[,':
+                position += 1
+            if buffer[position:position + 1] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                chunk = file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    if buffer[position:].strip():
+                        raise CommandError('Некорректный JSON в конце файла')
+                    return
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield item['name'].strip(), item['measurement_unit'].strip()
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
+
+
+def copy_batch(batch):
+    """COPY во временную таблицу и вставка без конфликтов (PostgreSQL)"""
+    table = connection.ops.quote_name(Ingredient._meta.db_table)
+    data = io.StringIO()
+    csv.writer(data).writerows(batch)
+    data.seek(0)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE ingredient_load '
+            '(name varchar(200), measurement_unit varchar(200)) '
+            'ON COMMIT DROP'
+        )
+        cursor.copy_expert(
+            'COPY ingredient_load (name, measurement_unit) '
+            'FROM STDIN WITH (FORMAT csv)', data
+        )
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            f'SELECT DISTINCT name, measurement_unit FROM ingredient_load '
+            f'ON CONFLICT (name, measurement_unit) DO NOTHING'
+        )
+
+
+def bulk_create_batch(batch):
+    Ingredient.objects.bulk_create(
+        (Ingredient(name=name, measurement_unit=measurement_unit)
+         for name, measurement_unit in set(batch)),
+        ignore_conflicts=True
+    )
+
+
+class Command(BaseCommand):
+    help = 'Загружает каталог ингредиентов из CSV или JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'ingredients.csv')
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .csv и .json')
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден')
+        write_batch = (copy_batch if connection.vendor == 'postgresql'
+                       else bulk_create_batch)
+
+        count_before = Ingredient.objects.count()
+        started = time.perf_counter()
+        processed = 0
+        for batch in batches(reader(path), options['batch_size']):
+            write_batch(batch)
+            processed += len(batch)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Обработано {processed} строк, '
+                f'{processed / elapsed:.0f} строк/с'
+            )
+        bump_catalog_version(INGREDIENTS)
+
+        elapsed = time.perf_counter() - started
+        added = Ingredient.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {processed} строк за {elapsed:.2f} с, '
+            f'добавлено {added} ингредиентов'
+        ))
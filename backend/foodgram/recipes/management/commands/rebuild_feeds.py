@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import feed
+from recipes.models import FeedEntry
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает материализованные ленты подписок'
+
+    def handle(self, *args, **options):
+        threshold = settings.FEED_MATERIALIZE_THRESHOLD
+        materialized = 0
+        user_ids = list(User.objects.filter(
+            subscriptions_count__gte=threshold).values_list('id', flat=True))
+        for user_id in user_ids:
+            with transaction.atomic():
+                feed.materialize(user_id)
+            materialized += 1
+        cleared, _ = FeedEntry.objects.filter(
+            user__subscriptions_count__lt=threshold).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Лент перестроено: {materialized}, '
+            f'лишних записей удалено: {cleared}'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counter
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+    (User, 'subscriptions_count', Subscription, 'user'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики рецептов и авторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            fixed = reconcile_counter(model, field, related_model,
+                                      related_field, options['batch_size'])
+            self.stdout.write(
+                f'{model.__name__}.{field}: исправлено {fixed}')
@@ -0,0 +1,83 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from recipes.images import RENDITIONS, RENDITIONS_DIR
+from recipes.models import Recipe
+from recipes.storage import is_content_addressed
+
+IMAGE_DIR = Recipe._meta.get_field('image').upload_to
+
+
+def rehash(name, directory):
+    """Сохраняет копию файла под именем по хэшу, возвращает новое имя.
+
+    Старый файл не удаляется: на него могут ссылаться другие рецепты.
+    """
+    if (not name or is_content_addressed(name)
+            or not default_storage.exists(name)):
+        return name
+    with default_storage.open(name) as file:
+        return default_storage.save(
+            os.path.join(directory, os.path.basename(name)), file)
+
+
+def rehash_recipe(recipe):
+    old_names = {recipe.image.name, *recipe.image_renditions.values()}
+    image = rehash(recipe.image.name, IMAGE_DIR)
+    renditions = {
+        rendition: rehash(path, RENDITIONS_DIR)
+        for rendition, path in recipe.image_renditions.items()
+    }
+    changed = (image != recipe.image.name
+               or renditions != recipe.image_renditions)
+    recipe.image, recipe.image_renditions = image, renditions
+    return recipe, changed, old_names - {image, *renditions.values()}
+
+
+def is_referenced(name):
+    condition = Q(image=name)
+    for rendition in RENDITIONS:
+        condition |= Q(**{f'image_renditions__{rendition}': name})
+    return Recipe.objects.filter(condition).exists()
+
+
+class Command(BaseCommand):
+    help = 'Переименовывает изображения рецептов по хэшу содержимого'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.only(
+            'id', 'image', 'image_renditions').order_by('id')
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(recipes.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                changed = []
+                stale = set()
+                for recipe, is_changed, old_names in executor.map(
+                        rehash_recipe, batch):
+                    if is_changed:
+                        changed.append(recipe)
+                        stale |= old_names
+                Recipe.objects.bulk_update(
+                    changed, ['image', 'image_renditions'])
+                for name in stale:
+                    if name and not is_referenced(name):
+                        default_storage.delete(name)
+                updated += len(changed)
+                self.stdout.write(f'Обработано до id={last_id}, '
+                                  f'обновлено {updated}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: обновлено рецептов {updated}'))
@@ -0,0 +1,214 @@
+import random
+import time
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from recipes import recipe_index
+from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Subscription, User
+
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class Zipf:
+    """Выборка из совокупности с вероятностью, убывающей по закону Ципфа"""
+
+    def __init__(self, rng, population, exponent):
+        self.rng = rng
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)
+        ))
+
+    def sample(self, k):
+        return self.rng.choices(
+            self.population, cum_weights=self.cum_weights, k=k)
+
+    def sample_unique(self, k):
+        return set(self.sample(k))
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
+
+
+def ids_after(model, last_id):
+    return list(model.objects.filter(pk__gt=last_id).order_by(
+        'pk').values_list('pk', flat=True))
+
+
+def last_id(model):
+    return model.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, nargs=2,
+                            default=[3, 12], metavar=('MIN', 'MAX'))
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int,
+                            default=10)
+        parser.add_argument('--zipf-exponent', type=float, default=1.1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix} уже есть, '
+                f'укажите другой --prefix')
+        ingredients = list(Ingredient.objects.order_by('pk').values_list(
+            'pk', 'name'))
+        if not ingredients:
+            raise CommandError(
+                'Каталог ингредиентов пуст, сначала выполните '
+                'load_ingredients')
+        self.ingredient_names = dict(ingredients)
+        self.ingredients = Zipf(
+            self.rng, self.ingredient_names, options['zipf_exponent'])
+        self.tag_ids = self.get_tag_ids()
+        self.started = time.perf_counter()
+
+        user_ids = self.create_users()
+        recipe_ids = self.create_recipes(
+            Zipf(self.rng, user_ids, options['zipf_exponent']))
+        recipes = Zipf(self.rng, recipe_ids, options['zipf_exponent'])
+        self.create_links(Favorite, 'recipe_id', user_ids, recipes,
+                          options['favorites_per_user'])
+        self.create_links(ShoppingCart, 'recipe_id', user_ids, recipes,
+                          options['cart_per_user'])
+        self.create_links(Subscription, 'author_id', user_ids,
+                          Zipf(self.rng, user_ids, options['zipf_exponent']),
+                          options['subscriptions_per_user'])
+
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_feeds', stdout=self.stdout)
+        recipe_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - self.started:.1f} с'))
+
+    def report(self, label, count):
+        self.stdout.write(
+            f'{label}: {count}, '
+            f'{time.perf_counter() - self.started:.1f} с от начала')
+
+    def get_tag_ids(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            )
+        return list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+
+    def insert(self, model, rows):
+        count = 0
+        for batch in batches(rows, self.options['batch_size']):
+            model.objects.bulk_create(batch)
+            count += len(batch)
+        return count
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        password = make_password(prefix)
+        before = last_id(User)
+        with transaction.atomic():
+            self.insert(User, (
+                User(username=f'{prefix}_{number}',
+                     email=f'{prefix}_{number}@foodgram.ru',
+                     first_name='Тест', last_name=str(number),
+                     password=password)
+                for number in range(self.options['users'])
+            ))
+        user_ids = ids_after(User, before)
+        self.report('Пользователи', len(user_ids))
+        return user_ids
+
+    def create_recipes(self, authors):
+        low, high = self.options['ingredients_per_recipe']
+        recipe_ids = []
+        total = self.options['recipes']
+        batch_size = self.options['batch_size']
+        for start in range(0, total, batch_size):
+            size = min(batch_size, total - start)
+            recipe_ingredients = [
+                list(self.ingredients.sample_unique(
+                    self.rng.randint(low, high)))
+                for _ in range(size)
+            ]
+            with transaction.atomic():
+                before = last_id(Recipe)
+                Recipe.objects.bulk_create(
+                    self.build_recipe(start + number, author_id, picked)
+                    for number, (author_id, picked) in enumerate(
+                        zip(authors.sample(size), recipe_ingredients))
+                )
+                batch_ids = ids_after(Recipe, before)
+                IngredientsInRecipe.objects.bulk_create(
+                    IngredientsInRecipe(recipe_id=recipe_id,
+                                        ingredient_id=ingredient_id,
+                                        amount=self.rng.randint(1, 500))
+                    for recipe_id, picked in zip(batch_ids,
+                                                 recipe_ingredients)
+                    for ingredient_id in picked
+                )
+                Recipe.tags.through.objects.bulk_create(
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                    for recipe_id in batch_ids
+                    for tag_id in self.rng.sample(
+                        self.tag_ids,
+                        self.rng.randint(1, len(self.tag_ids)))
+                )
+            recipe_ids.extend(batch_ids)
+            self.report('Рецепты', len(recipe_ids))
+        return recipe_ids
+
+    def build_recipe(self, number, author_id, ingredient_ids):
+        names = [self.ingredient_names[pk] for pk in ingredient_ids]
+        return Recipe(
+            author_id=author_id,
+            name=f'{names[0]} с {names[-1]} №{number}'[:200],
+            text='Возьмите: ' + ', '.join(names) + '.',
+            cooking_time=self.rng.randint(5, 180),
+            image='recipes/seed.png'
+        )
+
+    def create_links(self, model, target_field, user_ids, targets, average):
+        def rows():
+            for user_id in user_ids:
+                picked = targets.sample_unique(
+                    self.rng.randint(0, 2 * average))
+                if model is Subscription:
+                    # Подписаться на себя нельзя; id рецептов с id
+                    # пользователей не связаны
+                    picked.discard(user_id)
+                for target_id in picked:
+                    yield model(user_id=user_id, **{target_field: target_id})
+
+        with transaction.atomic():
+            count = self.insert(model, rows())
+        self.report(model._meta.verbose_name_plural, count)
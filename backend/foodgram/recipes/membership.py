@@ -0,0 +1,78 @@
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Favorite, ShoppingCart
+
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+
+MODELS = {
+    FAVORITES: Favorite,
+    SHOPPING_CART: ShoppingCart,
+}
+
+CACHE_KEY = 'recipe_membership:{}:{}:{}'
+GENERATION_KEY = 'recipe_membership_generation:{}:{}'
+CACHE_TIMEOUT = 60 * 60
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(event):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def stats():
+    """Счетчики попаданий и промахов кэша в текущем процессе"""
+    with _stats_lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses']}
+
+
+def _generation(user_id, kind):
+    """Поколение кэша пользователя; меняется при каждом сбросе"""
+    key = GENERATION_KEY.format(user_id, kind)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, CACHE_TIMEOUT)
+        generation = cache.get(key) or uuid.uuid4().hex
+    return generation
+
+
+def load_recipe_ids(user, kind):
+    return frozenset(
+        MODELS[kind].objects.filter(user=user).values_list(
+            'recipe_id', flat=True)
+    )
+
+
+def get_recipe_ids(user, kind):
+    """Множество id рецептов в избранном или корзине пользователя.
+
+    Поколение читается до запроса к базе, поэтому данные, прочитанные до
+    сброса, сохранятся под старым ключом и больше никем не прочитаются.
+    Без MEMBERSHIP_CACHE_ENABLED множество каждый раз читается из базы.
+    """
+    if user is None or user.is_anonymous:
+        return frozenset()
+    if not settings.MEMBERSHIP_CACHE_ENABLED:
+        return load_recipe_ids(user, kind)
+    key = CACHE_KEY.format(user.id, kind, _generation(user.id, kind))
+    recipe_ids = cache.get(key)
+    if recipe_ids is not None:
+        _count('hits')
+        return recipe_ids
+    _count('misses')
+    recipe_ids = load_recipe_ids(user, kind)
+    cache.set(key, recipe_ids, CACHE_TIMEOUT)
+    return recipe_ids
+
+
+def invalidate(user_id, kind):
+    cache.set(GENERATION_KEY.format(user_id, kind), uuid.uuid4().hex,
+              CACHE_TIMEOUT)
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.19 on 2026-10-18 16:38
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientsInRecipe = apps.get_model('recipes', 'IngredientsInRecipe')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1).order_by()
+    for group in duplicates:
+        extra_ids = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep_id']).values_list('id', flat=True))
+        for extra_id in extra_ids:
+            recipes_with_kept = list(IngredientsInRecipe.objects.filter(
+                ingredient_id=group['keep_id']
+            ).values_list('recipe_id', flat=True))
+            IngredientsInRecipe.objects.filter(
+                ingredient_id=extra_id, recipe_id__in=recipes_with_kept
+            ).delete()
+            IngredientsInRecipe.objects.filter(
+                ingredient_id=extra_id
+            ).update(ingredient_id=group['keep_id'])
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+    # Удаление дублей оставляет в PostgreSQL отложенные проверки внешних
+    # ключей, и ALTER TABLE в той же транзакции падает с "pending trigger
+    # events". Поэтому слияние выполняется в своей транзакции, а
+    # ограничение добавляется после ее фиксации.
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop,
+            atomic=True
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.19 on 2026-10-18 16:42
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 10000
+
+
+def fill_counter(model, field, related_model, related_field):
+    """Заполняет новый счетчик пакетами по id"""
+    total = Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+    last_id = model.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        model.objects.filter(
+            pk__gte=start, pk__lt=start + BATCH_SIZE
+        ).update(**{field: total})
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    fill_counter(Recipe, 'favorites_count',
+                 apps.get_model('recipes', 'Favorite'), 'recipe')
+    fill_counter(Recipe, 'shopping_count',
+                 apps.get_model('recipes', 'ShoppingCart'), 'recipe')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_pub_date_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в корзину'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.19 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('catalog', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Справочник')),
+                ('token', models.CharField(max_length=32, verbose_name='Токен версии')),
+                ('modified', models.DateTimeField(verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Catalog version',
+                'verbose_name_plural': 'Catalog versions',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.19 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_catalogversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIndexChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(null=True, verbose_name='Id рецепта')),
+            ],
+            options={
+                'verbose_name': 'Recipe index change',
+                'verbose_name_plural': 'Recipe index changes',
+            },
+        ),
+    ]
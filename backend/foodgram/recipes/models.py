@@ -1,7 +1,14 @@
-from django.db import models
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField)
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models
+from django.db.models.expressions import RawSQL, Window
+from django.db.models.functions import RowNumber
 from django.core.validators import MinValueValidator, MaxValueValidator
 
-from users.models import User
+from users.models import CountersMixin, Subscription, User
+
+SEARCH_CONFIG = 'russian'
 
 
 class Tag(models.Model):
@@ -48,12 +55,91 @@ class Ingredient(models.Model):
         verbose_name = 'Ingredient'
         verbose_name_plural = 'Ingredients'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_name_unit'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """Запросы к рецептам с данными для сериализатора"""
+
+    def with_user_flags(self, user):
+        if user is None or user.is_anonymous:
+            return self.annotate(
+                author_subscribed=models.Value(
+                    False, output_field=models.BooleanField()),
+            )
+        return self.annotate(
+            author_subscribed=models.Exists(Subscription.objects.filter(
+                user=user, author=models.OuterRef('author'))),
+        )
+
+    def latest_per_author(self, authors, limit=None):
+        """Первые limit рецептов каждого автора одним запросом"""
+        queryset = self.filter(author__in=authors)
+        if limit is None:
+            return queryset
+        ordering = [
+            models.F(field[1:]).desc() if field.startswith('-')
+            else models.F(field).asc()
+            for field in self.model._meta.ordering
+        ]
+        ranked = queryset.annotate(
+            recipe_rank=Window(
+                expression=RowNumber(),
+                partition_by=[models.F('author')],
+                order_by=ordering,
+            )
+        ).values('id', 'recipe_rank')
+        try:
+            sql, params = ranked.query.sql_with_params()
+        except EmptyResultSet:
+            return self.none()
+        return self.filter(id__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.recipe_rank <= %s',
+            (*params, limit)
+        ))
+
+    def search(self, value):
+        """Поиск по названию и тексту рецепта.
+
+        В PostgreSQL по search_vector с сортировкой по релевантности,
+        в остальных базах простым вхождением подстроки.
+        """
+        if connections[self.db].vendor != 'postgresql':
+            return self.filter(
+                models.Q(name__icontains=value)
+                | models.Q(text__icontains=value)
+            )
+        query = SearchQuery(value, config=SEARCH_CONFIG,
+                            search_type='websearch')
+        return self.filter(search_vector=query).annotate(
+            search_rank=SearchRank(models.F('search_vector'), query)
+        ).order_by('-search_rank', *self.model._meta.ordering)
+
+    def for_read(self, user):
+        return self.with_user_flags(user).defer(
+            'search_vector'
+        ).select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            models.Prefetch(
+                'ingredientsinrecipe',
+                queryset=IngredientsInRecipe.objects.select_related(
+                    'ingredient')
+            ),
+        )
+
+
+class Recipe(CountersMixin, models.Model):
     """Модель рецептов"""
 
     name = models.CharField(
@@ -84,6 +170,12 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to='recipes/'
     )
+    image_renditions = models.JSONField(
+        verbose_name='Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     cooking_time = models.PositiveIntegerField(
         verbose_name='Время приготовления, мин',
         validators=[
@@ -102,11 +194,36 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    shopping_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в корзину',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = ('favorites_count', 'shopping_count')
 
     class Meta:
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
-        ordering = ['name']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['author', 'name'],
@@ -115,10 +232,12 @@ class Recipe(models.Model):
         ]
 
     def is_favorited(self, user):
-        return self.favorites.filter(user=user).exists()
+        from .membership import FAVORITES, get_recipe_ids
+        return self.id in get_recipe_ids(user, FAVORITES)
 
     def is_in_shopping_cart(self, user):
-        return self.shopping.filter(user=user).exists()
+        from .membership import SHOPPING_CART, get_recipe_ids
+        return self.id in get_recipe_ids(user, SHOPPING_CART)
 
     def __str__(self):
         return self.name
@@ -229,3 +348,93 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} added {self.recipe} to shopping cart'
+
+
+class CatalogVersion(models.Model):
+    """Модель версии справочника, общей для всех процессов"""
+
+    catalog = models.CharField(
+        verbose_name='Справочник',
+        max_length=50,
+        primary_key=True
+    )
+    token = models.CharField(
+        verbose_name='Токен версии',
+        max_length=32
+    )
+    modified = models.DateTimeField(
+        verbose_name='Время изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Catalog version'
+        verbose_name_plural = 'Catalog versions'
+
+    def __str__(self):
+        return f'{self.catalog}: {self.token}'
+
+
+class RecipeIndexChange(models.Model):
+    """Модель журнала изменений состава рецептов для индекса ингредиентов.
+
+    Запись без рецепта требует перестроить индекс целиком.
+    """
+
+    recipe_id = models.BigIntegerField(
+        verbose_name='Id рецепта',
+        null=True
+    )
+
+    class Meta:
+        verbose_name = 'Recipe index change'
+        verbose_name_plural = 'Recipe index changes'
+
+
+class FeedEntry(models.Model):
+    """Модель записи материализованной ленты подписок"""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='feed_entries',
+        on_delete=models.CASCADE
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='feed_entries',
+        on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор рецепта',
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Feed entry'
+        verbose_name_plural = 'Feed entries'
+        ordering = ['-pub_date', '-recipe']
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} in feed of {self.user}'
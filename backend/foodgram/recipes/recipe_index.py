@@ -0,0 +1,175 @@
+import threading
+from functools import partial
+from itertools import chain
+
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max, Subquery
+
+from .models import IngredientsInRecipe, RecipeIndexChange
+
+MAX_INCREMENTAL_CHANGES = 1000
+# Журнал хранит вдвое больше записей, чем применяется по одной, чтобы
+# очистка не удалила изменения, которые процесс еще читает
+KEPT_CHANGES = 2 * MAX_INCREMENTAL_CHANGES
+
+
+def _changes():
+    return RecipeIndexChange.objects.using(DEFAULT_DB_ALIAS)
+
+
+def get_version():
+    return _changes().aggregate(version=Max('id'))['version'] or 0
+
+
+def _add_change(recipe_id):
+    """Добавляет запись в журнал и удаляет из него самые старые.
+
+    Версия индекса — наибольший id в журнале, поэтому записи должны
+    фиксироваться в порядке id: иначе запись с меньшим id, зафиксированная
+    позже, была бы пропущена процессами, уже прочитавшими большую версию.
+    Для этого добавления в журнал выполняются по очереди под блокировкой
+    таблицы; SQLite и так выполняет записывающие транзакции по одной.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'LOCK TABLE {RecipeIndexChange._meta.db_table} '
+                    f'IN EXCLUSIVE MODE')
+        _changes().create(recipe_id=recipe_id)
+        oldest_kept = _changes().order_by('-id').values('id')[
+            KEPT_CHANGES - 1:KEPT_CHANGES]
+        _changes().filter(id__lt=Subquery(oldest_kept)).delete()
+
+
+def record_change(recipe_id):
+    """Добавляет рецепт в журнал изменений индекса"""
+    _add_change(recipe_id)
+
+
+def invalidate():
+    """Заставляет все процессы перестроить индекс целиком"""
+    _add_change(None)
+
+
+def mark_changed(recipe_id):
+    transaction.on_commit(partial(record_change, recipe_id))
+
+
+_EMPTY = np.array((), dtype=np.int64)
+
+
+def _group(rows):
+    """Пары (id ингредиента, id рецепта) -> отсортированные массивы id
+    рецептов по ингредиентам"""
+    pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64)
+    ingredients, recipes = pairs.reshape(-1, 2).T
+    order = np.lexsort((recipes, ingredients))
+    ingredients, recipes = ingredients[order], recipes[order]
+    keys, starts = np.unique(ingredients, return_index=True)
+    return dict(zip(keys.tolist(), np.split(recipes, starts[1:])))
+
+
+class RecipeIngredientIndex:
+    """Обратный индекс ингредиент -> id рецептов в памяти процесса.
+
+    Списки рецептов хранятся отсортированными массивами numpy, и
+    совпадения считаются над ними целиком, без цикла по рецептам в
+    Python. Изменения
+    состава рецептов попадают в журнал в основной базе, и каждый процесс
+    применяет их к своему индексу, не перестраивая его целиком. Индекс
+    живет дольше запроса, поэтому читается только с основной базы:
+    отстающая реплика не должна попасть в него надолго.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._postings = {}
+
+    def _rebuild(self, version):
+        rows = IngredientsInRecipe.objects.using(DEFAULT_DB_ALIAS).values_list(
+            'ingredient_id', 'recipe_id')
+        self._postings = _group(rows.iterator())
+        self._version = version
+
+    def _apply(self, version):
+        recipe_ids = set(_changes().filter(
+            id__gt=self._version, id__lte=version
+        ).values_list('recipe_id', flat=True))
+        if None in recipe_ids:
+            self._rebuild(version)
+            return
+        changed = np.array(sorted(recipe_ids), dtype=np.int64)
+        postings = dict(self._postings)
+        for ingredient_id, recipes in self._postings.items():
+            stale = np.isin(recipes, changed, assume_unique=True)
+            if stale.any():
+                postings[ingredient_id] = recipes[~stale]
+        rows = IngredientsInRecipe.objects.using(DEFAULT_DB_ALIAS).filter(
+            recipe_id__in=recipe_ids).values_list('ingredient_id', 'recipe_id')
+        for ingredient_id, recipes in _group(rows).items():
+            postings[ingredient_id] = np.union1d(
+                postings.get(ingredient_id, recipes), recipes)
+        self._postings = postings
+        self._version = version
+
+    def _load(self):
+        version = get_version()
+        if self._version == version:
+            return self._postings
+        with self._lock:
+            if self._version != version:
+                if (self._version is None or version < self._version
+                        or version - self._version > MAX_INCREMENTAL_CHANGES):
+                    self._rebuild(version)
+                else:
+                    self._apply(version)
+            return self._postings
+
+    def rank(self, ingredient_ids):
+        """Id подходящих рецептов и число совпавших ингредиентов у каждого
+        по убыванию числа совпадений, затем id"""
+        postings = self._load()
+        found = [postings[ingredient_id] for ingredient_id in set(ingredient_ids)
+                 if ingredient_id in postings]
+        if not found:
+            return _EMPTY, _EMPTY
+        recipe_ids, matches = np.unique(
+            np.concatenate(found), return_counts=True)
+        order = np.lexsort((-recipe_ids, -matches))
+        return recipe_ids[order], matches[order]
+
+
+recipe_index = RecipeIngredientIndex()
+
+
+class RankedRecipes:
+    """Рецепты по убыванию числа совпавших ингредиентов, затем новые.
+
+    Поддерживает len() и срезы, поэтому подходит для Paginator.
+    """
+
+    def __init__(self, queryset, ranked):
+        self.queryset = queryset
+        self.recipe_ids, self.matches = ranked
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(len(self))
+        ranked = list(zip(self.recipe_ids[start:stop].tolist(),
+                          self.matches[start:stop].tolist()))
+        recipes = self.queryset.in_bulk([recipe_id for recipe_id, _ in ranked])
+        page = []
+        for recipe_id, matched in ranked:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.matched_ingredients = matched
+                page.append(recipe)
+        return page
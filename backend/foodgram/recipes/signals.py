@@ -0,0 +1,91 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import Subscription, User
+
+from . import feed, membership
+from .catalog import INGREDIENTS, TAGS, bump_catalog_version
+from .counters import change_counter
+from .models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+                     ShoppingCart, Tag)
+from .recipe_index import mark_changed
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    transaction.on_commit(partial(bump_catalog_version, INGREDIENTS))
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    transaction.on_commit(partial(bump_catalog_version, TAGS))
+
+
+@receiver([post_save, post_delete], sender=IngredientsInRecipe)
+def update_recipe_index(sender, instance, **kwargs):
+    mark_changed(instance.recipe_id)
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+def invalidate_favorites(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        membership.invalidate, instance.user_id, membership.FAVORITES))
+
+
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def invalidate_shopping_cart(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        membership.invalidate, instance.user_id, membership.SHOPPING_CART))
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def increment_shopping_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'shopping_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_shopping_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'shopping_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def publish_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        feed.publish(instance.id)
+
+
+@receiver(post_save, sender=Subscription)
+def add_author_to_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.subscribed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_author_from_feed(sender, instance, **kwargs):
+    feed.unsubscribed(instance.user_id, instance.author_id)
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+_HASHED_NAME = re.compile(r'(?:^|/)([0-9a-f]{2})/(\1[0-9a-f]{62})\.?[^/]*$')
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def is_content_addressed(name):
+    """Имя уже имеет вид <каталог>/<ab>/<ab...хэш>.<расширение>"""
+    return bool(name) and _HASHED_NAME.search(name) is not None
+
+
+def base_directory(name):
+    """Каталог, в котором лежит файл, без подкаталога хэша"""
+    directory = os.path.dirname(name)
+    if is_content_addressed(name):
+        directory = os.path.dirname(directory)
+    return directory
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, именующее файлы по хэшу содержимого.
+
+    Одинаковые файлы сохраняются один раз, а имя файла никогда не
+    указывает на другое содержимое, поэтому его можно кэшировать навсегда.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory = base_directory(name)
+        extension = os.path.splitext(name)[1].lower()
+        digest = content_hash(content)
+        name = os.path.join(directory, digest[:2], digest + extension)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        """Имя определяется содержимым, поэтому суффиксы к нему не
+        добавляются: файл с тем же именем — тот же файл"""
+        return name
+
+    def _save(self, name, content):
+        """Пишет файл под временным именем и ссылается на него под
+        итоговым, поэтому читатели не видят недописанный файл, а
+        параллельное сохранение того же содержимого не создает копию"""
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        try:
+            os.link(self.path(temporary), self.path(name))
+        except FileExistsError:
+            # Тот же файл уже сохранил параллельный процесс
+            pass
+        finally:
+            os.remove(self.path(temporary))
+        return name
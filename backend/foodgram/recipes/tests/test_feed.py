@@ -0,0 +1,52 @@
+from django.db.models.signals import post_delete, post_save
+from django.test import TestCase, override_settings
+
+from recipes.models import FeedEntry, Recipe
+from users import signals
+from users.models import Subscription, User
+
+
+@override_settings(FEED_MATERIALIZE_THRESHOLD=2)
+class FeedMaterializationTest(TestCase):
+    """Лента материализуется по числу подписок в таблице, поэтому не
+    зависит от того, обновлен ли уже счетчик подписок"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, *cls.authors = (
+            User.objects.create_user(
+                username=username, email=f'{username}@foodgram.ru',
+                password='x', first_name='a', last_name='b')
+            for username in ('user', 'first', 'second')
+        )
+        for author in cls.authors:
+            Recipe.objects.create(
+                name=f'recipe {author.username}', author=author, text='text',
+                cooking_time=5, image='recipes/image.jpg')
+
+    def setUp(self):
+        # Обработчики приложения users могли бы выполниться и после
+        # обработчиков recipes, если поменять порядок INSTALLED_APPS
+        post_save.disconnect(
+            signals.increment_followers_count, sender=Subscription)
+        post_delete.disconnect(
+            signals.decrement_followers_count, sender=Subscription)
+        self.addCleanup(
+            post_save.connect, signals.increment_followers_count,
+            sender=Subscription)
+        self.addCleanup(
+            post_delete.connect, signals.decrement_followers_count,
+            sender=Subscription)
+
+    def feed(self):
+        return set(FeedEntry.objects.filter(
+            user=self.user).values_list('author_id', flat=True))
+
+    def test_feed_follows_subscriptions(self):
+        first, second = self.authors
+        Subscription.objects.create(user=self.user, author=first)
+        self.assertEqual(self.feed(), set())
+        Subscription.objects.create(user=self.user, author=second)
+        self.assertEqual(self.feed(), {first.id, second.id})
+        Subscription.objects.get(user=self.user, author=second).delete()
+        self.assertEqual(self.feed(), set())
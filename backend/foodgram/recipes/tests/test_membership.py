@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.checks import check_membership_cache
+from recipes import membership
+from recipes.models import Favorite, Recipe
+from users.models import User
+
+
+@override_settings(MEMBERSHIP_CACHE_ENABLED=True)
+class MembershipCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@foodgram.ru', password='x',
+            first_name='a', last_name='b')
+        cls.recipe = Recipe.objects.create(
+            name='омлет', author=cls.user, text='text', cooking_time=5,
+            image='recipes/image.jpg')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self):
+        return membership.get_recipe_ids(self.user, membership.FAVORITES)
+
+    def test_invalidate_drops_cached_ids(self):
+        self.assertEqual(self.get(), frozenset())
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(self.get(), {self.recipe.id})
+
+    def test_invalidate_during_load_is_not_lost(self):
+        """Сброс между чтением из базы и записью в кэш не оставляет
+        в кэше устаревшие данные"""
+        load = membership.load_recipe_ids
+
+        def load_then_favorite(user, kind):
+            recipe_ids = load(user, kind)
+            with self.captureOnCommitCallbacks(execute=True):
+                Favorite.objects.create(user=self.user, recipe=self.recipe)
+            return recipe_ids
+
+        with mock.patch.object(membership, 'load_recipe_ids',
+                               load_then_favorite):
+            self.assertEqual(self.get(), frozenset())
+        self.assertEqual(self.get(), {self.recipe.id})
+
+    def test_cached_ids_are_reused(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.get()
+
+    @override_settings(MEMBERSHIP_CACHE_ENABLED=False)
+    def test_disabled_cache_reads_database(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.get(), frozenset())
+
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual(
+            [error.id for error in check_membership_cache(None)],
+            ['api.E003'])
+        with override_settings(MEMBERSHIP_CACHE_ENABLED=False):
+            self.assertEqual(check_membership_cache(None), [])
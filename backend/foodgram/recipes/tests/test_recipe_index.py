@@ -0,0 +1,87 @@
+from django.test import TestCase
+
+from recipes import recipe_index
+from recipes.models import (Ingredient, IngredientsInRecipe, Recipe,
+                            RecipeIndexChange)
+from recipes.recipe_index import RecipeIngredientIndex
+from users.models import User
+
+
+class RecipeIndexTest(TestCase):
+    """Журнал изменений индекса в базе виден каждому процессу"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@foodgram.ru', password='x',
+            first_name='a', last_name='b')
+        cls.salt, cls.egg = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'яйцо')
+        )
+        cls.recipe = Recipe.objects.create(
+            name='омлет', author=author, text='text', cooking_time=5,
+            image='recipes/image.jpg')
+        IngredientsInRecipe.objects.create(
+            recipe=cls.recipe, ingredient=cls.salt, amount=1)
+
+    def setUp(self):
+        # Два индекса изображают два процесса
+        self.first = RecipeIngredientIndex()
+        self.second = RecipeIngredientIndex()
+
+    @staticmethod
+    def matches(index, ingredient_ids):
+        recipe_ids, matches = index.rank(ingredient_ids)
+        return dict(zip(recipe_ids.tolist(), matches.tolist()))
+
+    def add_egg(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientsInRecipe.objects.create(
+                recipe=self.recipe, ingredient=self.egg, amount=2)
+
+    def test_change_reaches_every_index(self):
+        for index in (self.first, self.second):
+            self.assertEqual(self.matches(index, [self.egg.id]), {})
+        self.add_egg()
+        for index in (self.first, self.second):
+            self.assertEqual(
+                self.matches(index, [self.salt.id, self.egg.id]),
+                {self.recipe.id: 2})
+
+    def test_invalidate_rebuilds_index(self):
+        self.first.rank([self.egg.id])
+        IngredientsInRecipe.objects.create(
+            recipe=self.recipe, ingredient=self.egg, amount=2)
+        self.assertEqual(self.matches(self.first, [self.egg.id]), {})
+        recipe_index.invalidate()
+        self.assertEqual(
+            self.matches(self.first, [self.egg.id]), {self.recipe.id: 1})
+
+    def test_rank_orders_by_matches_then_newest(self):
+        newer = Recipe.objects.create(
+            name='соленое яйцо', author=self.recipe.author, text='text',
+            cooking_time=5, image='recipes/image.jpg')
+        newest = Recipe.objects.create(
+            name='соль', author=self.recipe.author, text='text',
+            cooking_time=5, image='recipes/image.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientsInRecipe.objects.bulk_create([
+                IngredientsInRecipe(
+                    recipe=newer, ingredient=self.salt, amount=1),
+                IngredientsInRecipe(
+                    recipe=newer, ingredient=self.egg, amount=1),
+                IngredientsInRecipe(
+                    recipe=newest, ingredient=self.salt, amount=1),
+            ])
+        recipe_index.invalidate()
+        recipe_ids, matches = self.first.rank([self.salt.id, self.egg.id])
+        self.assertEqual(recipe_ids.tolist(),
+                         [newer.id, newest.id, self.recipe.id])
+        self.assertEqual(matches.tolist(), [2, 1, 1])
+
+    def test_old_changes_are_pruned(self):
+        for recipe_id in range(recipe_index.MAX_INCREMENTAL_CHANGES * 3):
+            recipe_index.record_change(recipe_id)
+        self.assertEqual(RecipeIndexChange.objects.count(),
+                         recipe_index.KEPT_CHANGES)
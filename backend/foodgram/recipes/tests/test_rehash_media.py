@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from recipes.images import THUMBNAIL
+from recipes.models import Recipe
+from recipes.storage import is_content_addressed
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RehashMediaTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author', email='author@foodgram.ru', password='x',
+            first_name='a', last_name='b')
+        for name, content in (('recipes/old.jpg', b'image'),
+                              ('recipes/renditions/old_thumb.jpg', b'thumb')):
+            path = os.path.join(MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(content)
+
+    def create_recipe(self, image, renditions=None):
+        return Recipe.objects.create(
+            name=f'recipe {Recipe.objects.count()}', author=self.author,
+            text='text', cooking_time=5, image=image,
+            image_renditions=renditions or {})
+
+    def rehash(self):
+        call_command('rehash_media', workers=2, stdout=StringIO())
+
+    def test_renames_shared_files_once_and_keeps_them(self):
+        first = self.create_recipe(
+            'recipes/old.jpg',
+            {THUMBNAIL: 'recipes/renditions/old_thumb.jpg'})
+        second = self.create_recipe('recipes/old.jpg')
+
+        self.rehash()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        image = first.image.name
+        thumbnail = first.image_renditions[THUMBNAIL]
+        self.assertTrue(is_content_addressed(image))
+        self.assertEqual(os.path.dirname(os.path.dirname(image)), 'recipes')
+        self.assertEqual(os.path.dirname(os.path.dirname(thumbnail)),
+                         'recipes/renditions')
+        self.assertEqual(second.image.name, image)
+        self.assertTrue(default_storage.exists(image))
+        self.assertTrue(default_storage.exists(thumbnail))
+        self.assertFalse(default_storage.exists('recipes/old.jpg'))
+
+        self.rehash()
+        first.refresh_from_db()
+        self.assertEqual(first.image.name, image)
+        self.assertEqual(first.image_renditions[THUMBNAIL], thumbnail)
+        self.assertTrue(default_storage.exists(image))
+
+    def test_keeps_old_file_referenced_by_unprocessed_recipe(self):
+        self.create_recipe('recipes/old.jpg')
+        later = self.create_recipe('recipes/old.jpg')
+        call_command('rehash_media', workers=1, batch_size=1,
+                     stdout=StringIO())
+        later.refresh_from_db()
+        self.assertTrue(is_content_addressed(later.image.name))
+        self.assertFalse(default_storage.exists('recipes/old.jpg'))
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from recipes.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTest(SimpleTestCase):
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.location)
+            for root, _, names in os.walk(self.location) for name in names)
+
+    def test_same_content_is_saved_once(self):
+        name = self.storage.save('recipes/a.jpg', ContentFile(b'image'))
+        self.assertEqual(
+            self.storage.save('recipes/b.JPG', ContentFile(b'image')), name)
+        self.assertEqual(self.files(), [name])
+
+    def test_concurrent_save_does_not_duplicate(self):
+        name = self.storage.save('recipes/a.jpg', ContentFile(b'image'))
+        # Второй процесс проверил наличие файла до того, как его записал
+        # первый
+        exists = self.storage.exists
+        checks = iter([False])
+        with mock.patch.object(
+                self.storage, 'exists',
+                side_effect=lambda name: next(checks, exists(name))):
+            self.assertEqual(
+                self.storage.save('recipes/a.jpg', ContentFile(b'image')),
+                name)
+        self.assertEqual(self.files(), [name])
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'image')
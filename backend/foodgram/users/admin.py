@@ -12,7 +12,9 @@ class UserAdmin(admin.ModelAdmin):
         'username',
         'email',
         'first_name',
-        'last_name'
+        'last_name',
+        'recipes_count',
+        'followers_count'
     ]
     search_fields = ['username', 'first_name', 'last_name', 'email']
     list_filter = ['username', 'email']
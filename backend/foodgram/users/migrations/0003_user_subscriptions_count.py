@@ -0,0 +1,46 @@
+# Generated by Django 3.2.19 on 2026-10-18 16:55
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 10000
+
+
+def fill_counter(model, field, related_model, related_field):
+    """Заполняет новый счетчик пакетами по id"""
+    total = Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+    last_id = model.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        model.objects.filter(
+            pk__gte=start, pk__lt=start + BATCH_SIZE
+        ).update(**{field: total})
+
+
+def fill_subscriptions_count(apps, schema_editor):
+    fill_counter(apps.get_model('users', 'User'), 'subscriptions_count',
+                 apps.get_model('users', 'Subscription'), 'user')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='subscriptions_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписок'),
+        ),
+        migrations.RunPython(
+            fill_subscriptions_count, migrations.RunPython.noop
+        ),
+    ]
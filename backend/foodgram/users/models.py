@@ -2,7 +2,28 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 
-class User(AbstractUser):
+class CountersMixin:
+    """Не перезаписывает счетчики при сохранении существующего объекта.
+
+    Счетчики меняются только атомарными UPDATE с F(), поэтому значение
+    в памяти может быть устаревшим.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CountersMixin, AbstractUser):
     """Модель данных пользователя"""
 
     username = models.CharField(
@@ -27,6 +48,24 @@ class User(AbstractUser):
         verbose_name='Пароль',
         max_length=150
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('recipes_count', 'followers_count',
+                      'subscriptions_count')
 
     class Meta:
         verbose_name = 'User'
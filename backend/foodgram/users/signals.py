@@ -0,0 +1,44 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.counters import change_counter
+
+from .models import Subscription, User
+from .token_cache import token_cache
+
+
+@receiver(post_save, sender=Subscription)
+def increment_followers_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'followers_count', 1)
+        change_counter(User, instance.user_id, 'subscriptions_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_followers_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'followers_count', -1)
+    change_counter(User, instance.user_id, 'subscriptions_count', -1)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    # После удаления instance.key равен None, поэтому ключ берется сразу
+    transaction.on_commit(partial(token_cache.invalidate, instance.key))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    if created:
+        return
+    keys = ()
+    if settings.AUTH_TOKEN_CACHE_SHARED:
+        keys = list(Token.objects.filter(
+            user_id=instance.pk).values_list('key', flat=True))
+    transaction.on_commit(
+        partial(token_cache.invalidate_user, instance.pk, keys))
@@ -0,0 +1,122 @@
+import copy
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_KEY = 'auth_token:{}'
+
+
+class TokenCache:
+    """Кэш пользователей по ключу токена.
+
+    При AUTH_TOKEN_CACHE_SHARED записи хранятся в общем кэше Django,
+    и сброс при отзыве токена сразу виден всем процессам.
+    AUTH_TOKEN_CACHE_LOCAL добавляет перед ним LRU в памяти процесса
+    с ограничением по времени и размеру; его сброс виден только текущему
+    процессу, поэтому в остальных отозванный токен действует еще до
+    AUTH_TOKEN_CACHE_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._stats = Counter()
+
+    def stats(self):
+        """Счетчики попаданий и промахов кэша в текущем процессе"""
+        with self._lock:
+            return {'hits': self._stats['hits'],
+                    'misses': self._stats['misses']}
+
+    @staticmethod
+    def enabled():
+        return settings.AUTH_TOKEN_CACHE_TTL > 0 and (
+            settings.AUTH_TOKEN_CACHE_SHARED or settings.AUTH_TOKEN_CACHE_LOCAL)
+
+    def get(self, key):
+        if not self.enabled():
+            return None
+        if settings.AUTH_TOKEN_CACHE_LOCAL:
+            user = self._lookup(key)
+            if user is not None:
+                return user
+        if settings.AUTH_TOKEN_CACHE_SHARED:
+            user = cache.get(CACHE_KEY.format(key))
+            if user is not None:
+                if settings.AUTH_TOKEN_CACHE_LOCAL:
+                    self._store(key, user)
+                with self._lock:
+                    self._stats['hits'] += 1
+                return copy.copy(user)
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key, user):
+        if not self.enabled():
+            return
+        if settings.AUTH_TOKEN_CACHE_SHARED:
+            cache.set(CACHE_KEY.format(key), user,
+                      settings.AUTH_TOKEN_CACHE_TTL)
+        if settings.AUTH_TOKEN_CACHE_LOCAL:
+            self._store(key, user)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._discard(key)
+        if settings.AUTH_TOKEN_CACHE_SHARED:
+            cache.delete(CACHE_KEY.format(key))
+
+    def invalidate_user(self, user_id, keys=()):
+        with self._lock:
+            keys = set(keys) | self._user_keys.get(user_id, set())
+            for key in keys:
+                self._discard(key)
+        if settings.AUTH_TOKEN_CACHE_SHARED:
+            cache.delete_many([CACHE_KEY.format(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def _lookup(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires <= now:
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return copy.copy(user)
+
+    def _store(self, key, user):
+        expires = time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (expires, copy.copy(user))
+            self._user_keys.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1].pk
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+
+token_cache = TokenCache()